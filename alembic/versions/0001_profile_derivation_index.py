@@ -0,0 +1,42 @@
+"""profile derivation index, nullable secrets for HD-derived profiles
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 12:00:00.000000
+
+The migrations start from the schema that existed before them, so this revision alters a profiles table it does
+not create. Databases created by DBHelper.create_all_tables already have the head schema and are marked as such
+with `make stamp` (alembic stamp head) instead of being upgraded.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SECRET_COLUMNS = ('evm_private', 'aptos_private', 'solana_private', 'btc_mnemo')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('profiles') as batch_op:
+        batch_op.add_column(sa.Column('derivation_index', sa.Integer(), nullable=True))
+        batch_op.create_unique_constraint('uq_profiles_derivation_index', ['derivation_index'])
+        for column in SECRET_COLUMNS:
+            batch_op.alter_column(column, existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('profiles') as batch_op:
+        for column in SECRET_COLUMNS:
+            batch_op.alter_column(column, existing_type=sa.String(), nullable=False)
+        batch_op.drop_constraint('uq_profiles_derivation_index', type_='unique')
+        batch_op.drop_column('derivation_index')
@@ -0,0 +1,36 @@
+"""nullable profile address columns for profiles created with a subset of chains
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ADDRESS_COLUMNS = (
+    'evm_address', 'aptos_address', 'solana_address', 'btc_native_segwit_address', 'btc_taproot_address'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('profiles') as batch_op:
+        for column in ADDRESS_COLUMNS:
+            batch_op.alter_column(column, existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('profiles') as batch_op:
+        for column in ADDRESS_COLUMNS:
+            batch_op.alter_column(column, existing_type=sa.String(), nullable=False)
@@ -0,0 +1,49 @@
+"""change feed indexes and tombstones
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = (
+    'data_keys', 'emails', 'proxies', 'binances', 'bitgets', 'bybits', 'discords', 'githubs', 'mexcs', 'okxs',
+    'twitters', 'binance_deposits', 'bitget_deposits', 'bybit_deposits', 'mexc_deposits', 'okx_deposits', 'profiles'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.execute(
+            f'UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL'
+        )
+        op.create_index(f'ix_{table}_updated_at_id', table, ['updated_at', 'id'])
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstones_table_name_deleted_at_id', 'tombstones', ['table_name', 'deleted_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tombstones_table_name_deleted_at_id', table_name='tombstones')
+    op.drop_table('tombstones')
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_updated_at_id', table_name=table)
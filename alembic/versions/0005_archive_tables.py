@@ -0,0 +1,338 @@
+"""archive tables
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('archived_binance_deposits',
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('evm', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('binance_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_binance_deposits', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_binance_deposits_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_binances',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_key', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_binances', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_binances_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_bitget_deposits',
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('evm', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('bitget_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_bitget_deposits', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_bitget_deposits_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_bitgets',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_key', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_bitgets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_bitgets_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_bybit_deposits',
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('evm', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('bybit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_bybit_deposits', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_bybit_deposits_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_bybits',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_key', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_bybits', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_bybits_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_discords',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('login', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('auth_token', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_discords', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_discords_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_emails',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('login', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('refresh_token', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('access_token', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('client_id', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('client_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('access_token_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_emails', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_emails_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_githubs',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('login', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_githubs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_githubs_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_mexc_deposits',
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('evm', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('mexc_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_mexc_deposits', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_mexc_deposits_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_mexcs',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_key', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_mexcs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_mexcs_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_okx_deposits',
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('evm', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('okx_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_okx_deposits', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_okx_deposits_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_okxs',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_key', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('api_passphrase', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_okxs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_okxs_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_profiles',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('evm_address', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos_address', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana_address', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('btc_native_segwit_address', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('btc_taproot_address', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('evm_private', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('aptos_private', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('solana_private', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('btc_mnemo', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('derivation_index', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('binance_deposit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('bybit_deposit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('okx_deposit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('mexc_deposit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('bitget_deposit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('twitter_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('discord_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('github_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('binance_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('bybit_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('okx_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('mexc_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('bitget_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('proxy_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_profiles', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_profiles_archived_at'), ['archived_at'], unique=False)
+
+    op.create_table('archived_twitters',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('login', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('auth_token', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('ready', sa.Boolean(), autoincrement=False, nullable=True),
+    sa.Column('totp_secret', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('backup_code', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('password_updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('password', sa.String(), autoincrement=False, nullable=True),
+    sa.Column('created_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('updated_at', sa.DateTime(), autoincrement=False, nullable=True),
+    sa.Column('email_id', sa.Integer(), autoincrement=False, nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_twitters', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_twitters_archived_at'), ['archived_at'], unique=False)
+
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('archived_twitters', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_twitters_archived_at'))
+
+    op.drop_table('archived_twitters')
+    with op.batch_alter_table('archived_profiles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_profiles_archived_at'))
+
+    op.drop_table('archived_profiles')
+    with op.batch_alter_table('archived_okxs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_okxs_archived_at'))
+
+    op.drop_table('archived_okxs')
+    with op.batch_alter_table('archived_okx_deposits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_okx_deposits_archived_at'))
+
+    op.drop_table('archived_okx_deposits')
+    with op.batch_alter_table('archived_mexcs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_mexcs_archived_at'))
+
+    op.drop_table('archived_mexcs')
+    with op.batch_alter_table('archived_mexc_deposits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_mexc_deposits_archived_at'))
+
+    op.drop_table('archived_mexc_deposits')
+    with op.batch_alter_table('archived_githubs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_githubs_archived_at'))
+
+    op.drop_table('archived_githubs')
+    with op.batch_alter_table('archived_emails', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_emails_archived_at'))
+
+    op.drop_table('archived_emails')
+    with op.batch_alter_table('archived_discords', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_discords_archived_at'))
+
+    op.drop_table('archived_discords')
+    with op.batch_alter_table('archived_bybits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_bybits_archived_at'))
+
+    op.drop_table('archived_bybits')
+    with op.batch_alter_table('archived_bybit_deposits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_bybit_deposits_archived_at'))
+
+    op.drop_table('archived_bybit_deposits')
+    with op.batch_alter_table('archived_bitgets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_bitgets_archived_at'))
+
+    op.drop_table('archived_bitgets')
+    with op.batch_alter_table('archived_bitget_deposits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_bitget_deposits_archived_at'))
+
+    op.drop_table('archived_bitget_deposits')
+    with op.batch_alter_table('archived_binances', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_binances_archived_at'))
+
+    op.drop_table('archived_binances')
+    with op.batch_alter_table('archived_binance_deposits', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_binance_deposits_archived_at'))
+
+    op.drop_table('archived_binance_deposits')
@@ -0,0 +1,34 @@
+"""profile capability bitmask for composite filters
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('profiles') as batch_op:
+        batch_op.add_column(sa.Column('capabilities', sa.Integer(), server_default='0', nullable=False))
+    with op.batch_alter_table('archived_profiles') as batch_op:
+        batch_op.add_column(sa.Column('capabilities', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('archived_profiles') as batch_op:
+        batch_op.drop_column('capabilities')
+    with op.batch_alter_table('profiles') as batch_op:
+        batch_op.drop_column('capabilities')
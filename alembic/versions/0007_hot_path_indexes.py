@@ -0,0 +1,45 @@
+"""indexes for hot-path predicates: proxy usage, ready flags and TOTP secrets
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+READY_TABLES = ('twitters',)
+TOTP_TABLES = ('emails', 'twitters', 'binances', 'bybits', 'okxs', 'mexcs', 'bitgets')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_profiles_proxy_id', 'profiles', ['proxy_id'])
+    op.create_index('ix_proxies_proxy_type_id', 'proxies', ['proxy_type', 'id'])
+    ready = sa.column('ready') == sa.true()
+    for table in READY_TABLES:
+        op.create_index(f'ix_{table}_id_ready', table, ['id'], sqlite_where=ready, postgresql_where=ready)
+    totp = sa.column('totp_secret').isnot(None)
+    for table in TOTP_TABLES:
+        op.create_index(
+            f'ix_{table}_id_totp_secret', table, ['id', 'totp_secret'], sqlite_where=totp, postgresql_where=totp
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TOTP_TABLES:
+        op.drop_index(f'ix_{table}_id_totp_secret', table_name=table)
+    for table in READY_TABLES:
+        op.drop_index(f'ix_{table}_id_ready', table_name=table)
+    op.drop_index('ix_proxies_proxy_type_id', table_name='proxies')
+    op.drop_index('ix_profiles_proxy_id', table_name='profiles')
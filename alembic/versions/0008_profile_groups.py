@@ -0,0 +1,49 @@
+"""profile groups with many-to-many membership
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'profile_groups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index('ix_profile_groups_updated_at_id', 'profile_groups', ['updated_at', 'id'])
+    op.create_table(
+        'profile_group_members',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('profile_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['profile_groups.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['profile_id'], ['profiles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('group_id', 'profile_id')
+    )
+    op.create_index('ix_profile_group_members_profile_id', 'profile_group_members', ['profile_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_profile_group_members_profile_id', table_name='profile_group_members')
+    op.drop_table('profile_group_members')
+    op.drop_index('ix_profile_groups_updated_at_id', table_name='profile_groups')
+    op.drop_table('profile_groups')
@@ -0,0 +1,42 @@
+"""archived group memberships of archived profiles
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'archived_profile_group_members',
+        sa.Column('group_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('profile_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('group_id', 'profile_id')
+    )
+    op.create_index(
+        'ix_archived_profile_group_members_archived_at', 'archived_profile_group_members', ['archived_at']
+    )
+    op.create_index(
+        'ix_archived_profile_group_members_profile_id', 'archived_profile_group_members', ['profile_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_archived_profile_group_members_profile_id', table_name='archived_profile_group_members')
+    op.drop_index('ix_archived_profile_group_members_archived_at', table_name='archived_profile_group_members')
+    op.drop_table('archived_profile_group_members')
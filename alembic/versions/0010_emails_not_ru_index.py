@@ -0,0 +1,30 @@
+"""partial index of non-.ru emails for unused-email lookups
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Must render like models.email.not_ru_login for SQLite to use the index.
+    not_ru = sa.not_(sa.column('login').ilike(sa.literal_column("'%.ru'")))
+    op.create_index('ix_emails_id_not_ru', 'emails', ['id'], sqlite_where=not_ru, postgresql_where=not_ru)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_id_not_ru', table_name='emails')
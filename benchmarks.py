@@ -0,0 +1,531 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from web3db import *
+from web3db.models import Base
+
+
+async def seed_profiles(db: DBHelper, n: int):
+    await db.create_all_tables(Base)
+    proxies = [Proxy(proxy_string=f'proxy{i}', proxy_type='individual') for i in range(n // 3 + 1)]
+    profiles = []
+    for i in range(n):
+        email = Email(login=f'email{i}@mail.com', password='password')
+        twitter = Twitter(
+            login=f'twitter{i}', auth_token=f'token{i}', password='password', ready=True,
+            email=Email(login=f'twitter{i}@mail.com', password='password')
+        )
+        profiles.append(Profile(
+            evm_address=f'0x{i:040x}', aptos_address=f'0x{i:064x}', solana_address=f'solana{i}',
+            btc_native_segwit_address=f'bc1q{i}', btc_taproot_address=f'bc1p{i}',
+            evm_private='-' * 1024, aptos_private='-' * 1024, solana_private='-' * 1024, btc_mnemo='-' * 1024,
+            proxy=proxies[i // 3], email=email, twitter=twitter
+        ))
+    await db.add_record(proxies)
+    await db.add_record(profiles)
+
+
+async def seed_mixed_profiles(db: DBHelper, n: int):
+    """Realistic mix: 10% ready and 20% TOTP twitters, 20% shared proxies, spare accounts and .ru emails."""
+    await db.create_all_tables(Base)
+
+    def email(prefix: str, i: int) -> Email:
+        return Email(
+            login=f'{prefix}{i}@mail.{"ru" if i % 10 == 0 else "com"}', password='password',
+            totp_secret='JBSWY3DPEHPK3PXP' if i % 5 == 0 else None
+        )
+
+    proxies = [
+        Proxy(proxy_string=f'proxy{i}', proxy_type='shared' if i % 5 == 0 else 'individual') for i in range(n // 2)
+    ]
+    twitters = [
+        Twitter(
+            login=f'twitter{i}', auth_token=f'token{i}', password='password', ready=i % 10 == 0,
+            totp_secret='JBSWY3DPEHPK3PXP' if i % 5 == 0 else None, email=email('twitter', i)
+        )
+        for i in range(n + n // 5)
+    ]
+    discords = [
+        Discord(login=f'discord{i}', auth_token=f'discord{i}', password='password', email=email('discord', i))
+        for i in range(n // 2)
+    ]
+    profiles = [
+        Profile(
+            evm_address=f'0x{i:040x}', proxy=proxies[i * 7 % len(proxies)], email=email('profile', i),
+            twitter=twitters[i], discord=discords[i] if i < len(discords) and i % 3 else None
+        )
+        for i in range(n)
+    ]
+    await db.add_record(proxies + [email('spare', i) for i in range(n // 5)] + twitters[n:] + discords)
+    await db.add_record(profiles)
+
+
+async def measure(name: str, coro_factory, rows: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await coro_factory()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f'{name:<32} {len(result):>8} rows {elapsed * 1000:>10.1f} ms '
+        f'{elapsed / rows * 1e6:>8.1f} us/row {peak / rows:>10.0f} B/row peak'
+    )
+    return result
+
+
+async def bench_profile_views(n: int):
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_profiles(db, n)
+        await measure('get_ready_profiles_by_model', lambda: db.get_ready_profiles_by_model(Twitter), n)
+        await measure('get_ready_profile_views_by_model', lambda: db.get_ready_profile_views_by_model(Twitter), n)
+        await db.engine.dispose()
+
+
+IMPORT_TARGET_MS = 500
+LAZY_MODULES = ('eth_account', 'aptos_sdk', 'solders', 'bitcoinutils', 'mnemonic', 'gnupg', 'pydantic_settings')
+
+
+async def bench_startup(n: int):
+    script = (
+        'import sys, time; start = time.perf_counter(); import web3db; '
+        'print((time.perf_counter() - start) * 1000); '
+        f'print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))'
+    )
+    timings = []
+    for _ in range(min(n, 20)):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        elapsed, eager_modules = output.splitlines()[:2]
+        timings.append(float(elapsed))
+    median = statistics.median(timings)
+    print(f'cold import web3db: median {median:.1f} ms, min {min(timings):.1f} ms (target {IMPORT_TARGET_MS} ms)')
+    if eager_modules:
+        print(f'imported eagerly: {eager_modules}')
+    if median > IMPORT_TARGET_MS or eager_modules:
+        sys.exit(1)
+
+
+async def bench_logging(n: int):
+    import web3db.utils.logger as logger_module
+    from web3db.utils import my_logger
+
+    ids = list(range(1000))
+    with TemporaryDirectory() as tmp:
+        logger_module.MAIN_DIR = Path(tmp)
+        for mode in logger_module.LOG_MODES:
+            my_logger.configure(mode=mode)
+            start = time.perf_counter()
+            for i in range(n):
+                my_logger.debug('Getting {} rows by ids', len(ids))
+                my_logger.sampled('INFO', '{} | twitter {} -> {}', i, i, i + 1)
+            elapsed = time.perf_counter() - start
+            my_logger.complete()
+            print(f'{mode:<8} {elapsed / (2 * n) * 1e6:>8.2f} us/message on the calling thread')
+        my_logger.remove()
+
+
+async def bench_wallet_generation(n: int):
+    from web3db.wallets import CHAINS, HDKeychain, generate_master_seed, generate_random_wallets
+
+    n = min(n, 200)
+    start = time.perf_counter()
+    for _ in range(n):
+        generate_random_wallets()
+    random_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    keychain = HDKeychain(generate_master_seed())
+    for index in range(n):
+        keychain.derive(index)
+    hd_elapsed = time.perf_counter() - start
+    print(f'random keys  {n / random_elapsed:>8.1f} profiles/sec (+4 gpg encryptions per profile)')
+    print(f'HD derived   {n / hd_elapsed:>8.1f} profiles/sec (no per-profile secrets stored)')
+    for chain in CHAINS:
+        start = time.perf_counter()
+        for _ in range(n):
+            generate_random_wallets([chain])
+        print(f'{chain + " only":<12} {n / (time.perf_counter() - start):>8.1f} profiles/sec (+1 gpg encryption)')
+
+
+async def bench_envelope(n: int):
+    from web3db.utils.envelope import DataKeyRing, generate_data_key
+    from web3db.utils.encrypt_private import encrypt, decrypt
+
+    secret = '0x' + '11' * 32
+    ring = DataKeyRing({1: generate_data_key()})
+    seal = ring.encryptor(1)
+    sealed = seal(secret)
+    start = time.perf_counter()
+    for _ in range(n):
+        ring.decrypt(sealed)
+    print(f'envelope  {len(sealed):>6} B/secret {(time.perf_counter() - start) / n * 1e6:>10.1f} us/decrypt')
+    recipient, passphrase = os.getenv('GPG_RECIPIENT'), os.getenv('PASSPHRASE')
+    if recipient:
+        armored = encrypt(secret, passphrase=passphrase, recipient=recipient)
+        count = min(n, 10)
+        start = time.perf_counter()
+        for _ in range(count):
+            decrypt(armored, passphrase)
+        print(f'gpg       {len(armored):>6} B/secret {(time.perf_counter() - start) / count * 1e6:>10.1f} us/decrypt')
+
+
+async def serve_token_endpoint(latency: float, stats: dict):
+    """Local stand-in OAuth token endpoint answering every request after `latency` seconds."""
+    import json
+
+    async def handle(reader, writer):
+        await reader.readuntil(b'\r\n\r\n')
+        stats['in_flight'] += 1
+        stats['peak'] = max(stats['peak'], stats['in_flight'])
+        await asyncio.sleep(latency)
+        stats['in_flight'] -= 1
+        stats['requests'] += 1
+        body = json.dumps({'access_token': f'access{stats["requests"]}', 'expires_in': 3600}).encode()
+        writer.write(
+            b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n'
+            b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+        )
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+async def bench_token_refresh(n: int):
+    from web3db.oauth import EmailTokenManager
+
+    stats = {'in_flight': 0, 'peak': 0, 'requests': 0}
+    server = await serve_token_endpoint(0.02, stats)
+    port = server.sockets[0].getsockname()[1]
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await db.create_all_tables(Base)
+        await db.add_record([
+            Email(login=f'email{i}@mail.com', password='password', refresh_token=f'refresh{i}', client_id='client')
+            for i in range(n)
+        ])
+        manager = EmailTokenManager(db, token_url=f'http://127.0.0.1:{port}/token', concurrency=16, jitter=0.01)
+        report = await manager.refresh_due()
+        print(f'refresh_due     {report} ({report.refreshed / report.elapsed:.0f} tokens/sec, '
+              f'peak {stats["peak"]} concurrent requests)')
+        start = time.perf_counter()
+        tokens = await manager.access_tokens(list(range(1, n + 1)))
+        elapsed = time.perf_counter() - start
+        print(f'access_tokens   {len(tokens)} served in {elapsed * 1000:.1f} ms, {stats["requests"]} endpoint requests')
+        await db.engine.dispose()
+    server.close()
+
+
+async def bench_sqlite_writes(n: int, concurrency: int = 50):
+    async def writer(db: DBHelper, worker: int, counts: dict):
+        for i in range(worker, n, concurrency):
+            try:
+                await db.add_record(Email(login=f'email{i}@mail.com', password='password'))
+                counts['ok'] += 1
+            except Exception:
+                counts['errors'] += 1
+
+    for sqlite_mode in (False, True):
+        with TemporaryDirectory() as tmp:
+            db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}', sqlite_mode=sqlite_mode)
+            await db.create_all_tables(Base)
+            counts = {'ok': 0, 'errors': 0}
+            start = time.perf_counter()
+            await asyncio.gather(*[writer(db, worker, counts) for worker in range(concurrency)])
+            elapsed = time.perf_counter() - start
+            transactions = db.writer.transactions if db.writer else counts['ok'] + counts['errors']
+            print(
+                f'sqlite_mode={sqlite_mode!s:<5} {counts["ok"]:>7} writes {counts["errors"]:>5} errors '
+                f'{transactions:>7} transactions {counts["ok"] / elapsed:>8.0f} writes/sec'
+            )
+            await db.close()
+
+
+async def bench_write_behind(n: int):
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_profiles(db, 100)
+        twitters = await db.get_all_from_table(Twitter)
+        count = min(n, 1000)
+        start = time.perf_counter()
+        for i in range(count):
+            twitter = twitters[i % len(twitters)]
+            twitter.ready = bool(i % 2)
+            await db.edit(twitter)
+        print(f'edit          {count / (time.perf_counter() - start):>10.0f} updates/sec')
+        buffer = db.enable_write_behind()
+        start = time.perf_counter()
+        for i in range(n):
+            buffer.set(Twitter, twitters[i % len(twitters)].id, ready=bool(i % 2), password=f'password{i}')
+        await buffer.flush()
+        print(f'write_buffer  {n / (time.perf_counter() - start):>10.0f} updates/sec  {buffer.metrics}')
+        await db.close()
+
+
+async def bench_snapshot(n: int):
+    from web3db.snapshot import ProfileSnapshot
+
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_profiles(db, n)
+        path = Path(tmp) / 'profiles.snapshot'
+        start = time.perf_counter()
+        await db.export_snapshot(path)
+        elapsed = time.perf_counter() - start
+        print(f'export              {elapsed * 1000:>10.1f} ms {path.stat().st_size / n:>8.0f} B/row')
+        start = time.perf_counter()
+        await db.get_profile_views()
+        print(f'db profile views    {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        start = time.perf_counter()
+        snapshot = ProfileSnapshot(path)
+        ids = random.sample(range(1, n + 1), min(n, 1000))
+        snapshot.get_profile_views(ids)
+        print(f'snapshot open+1000  {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        start = time.perf_counter()
+        snapshot.get_profile_views()
+        print(f'snapshot all views  {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        start = time.perf_counter()
+        await db.get_ready_profiles_ids_by_model(Twitter)
+        print(f'db ready ids        {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        start = time.perf_counter()
+        snapshot.get_ready_profiles_ids_by_model(Twitter)
+        print(f'snapshot ready ids  {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        snapshot.close()
+        await db.close()
+
+
+async def bench_export(n: int):
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_profiles(db, n)
+        for batch_size in (1_000, 10_000):
+            tracemalloc.start()
+            report = await db.export_rows(Path(tmp) / 'profiles.csv', batch_size=batch_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'csv batch {batch_size:<6} {report.rows_per_sec:>10.0f} rows/sec {peak / 2 ** 20:>8.1f} MiB peak')
+        await measure('get_profile_views (all rows)', lambda: db.get_profile_views(), n)
+        await db.close()
+
+
+async def bench_inventory(n: int):
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_profiles(db, n)
+        await db.add_record([Proxy(proxy_string=f'free{i}', proxy_type='individual') for i in range(n // 3)])
+        await db.add_record([Email(login=f'unused{i}@mail.com', password='password') for i in range(n)])
+        start = time.perf_counter()
+        await db.get_unused_proxies()
+        await db.get_unused_emails()
+        for model in (Twitter, Discord, Github):
+            await db.get_unused_model(model)
+        print(f'unused lists        {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        start = time.perf_counter()
+        inventory = await db.get_inventory()
+        print(f'inventory           {(time.perf_counter() - start) * 1000:>10.1f} ms  {inventory}')
+        start = time.perf_counter()
+        await db.get_inventory(cache_ttl=5)
+        print(f'inventory (cached)  {(time.perf_counter() - start) * 1000:>10.3f} ms')
+        await db.close()
+
+
+async def bench_filters(n: int):
+    from web3db.filters import ready, has, proxy_type
+
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_profiles(db, n)
+        profile_filter = ready(Twitter) & has(Email) & proxy_type('individual')
+        start = time.perf_counter()
+        ready_ids = set(await db.get_ready_profiles_ids_by_model(Twitter))
+        individual_ids = {profile.id for profile in await db.get_profiles_with_individual_proxies()}
+        ids = ready_ids & individual_ids
+        print(f'intersect in python {(time.perf_counter() - start) * 1000:>10.1f} ms {len(ids)} ids')
+        start = time.perf_counter()
+        ids = await db.filter_profile_ids(profile_filter)
+        print(f'filter              {(time.perf_counter() - start) * 1000:>10.1f} ms {len(ids)} ids')
+        start = time.perf_counter()
+        await db.refresh_capabilities()
+        print(f'refresh bitmask     {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        start = time.perf_counter()
+        ids = await db.filter_profile_ids(profile_filter, use_capabilities=True)
+        print(f'filter (bitmask)    {(time.perf_counter() - start) * 1000:>10.1f} ms {len(ids)} ids')
+        await db.close()
+
+
+async def bench_indexes(n: int):
+    """Median timings of the DBHelper queries behind each index of migrations 0007 and 0010, without and with it."""
+    from web3db.filters import ready, proxy_type, with_totp
+    from web3db.totp import TotpService
+
+    names = (
+        'ix_profiles_proxy_id', 'ix_proxies_proxy_type_id', 'ix_twitters_id_ready', 'ix_twitters_id_totp_secret',
+        'ix_emails_id_totp_secret', 'ix_emails_id_not_ru'
+    )
+    indexes = [index for table in Base.metadata.tables.values() for index in table.indexes if index.name in names]
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_mixed_profiles(db, n)
+        totp = TotpService(db)
+        queries = {
+            'get_ready_profiles_ids_by_model': lambda: db.get_ready_profiles_ids_by_model(Twitter),
+            'get_inventory': lambda: db.get_inventory(),
+            'get_unused_proxies': lambda: db.get_unused_proxies(),
+            "filter_profile_ids(ready & proxy_type('shared'))": lambda: db.filter_profile_ids(
+                ready(Twitter) & proxy_type('shared')
+            ),
+            'filter_profile_ids(with_totp(Twitter))': lambda: db.filter_profile_ids(with_totp(Twitter)),
+            'load_secrets(Twitter)': lambda: totp.load_secrets(Twitter),
+            'load_secrets(Email)': lambda: totp.load_secrets(Email),
+            'get_unused_emails': lambda: db.get_unused_emails(),
+            'get_unused_emails(limit=100)': lambda: db.get_unused_emails(limit=100),
+            'get_not_used_emails': lambda: db.get_not_used_emails([Profile, Twitter, Discord]),
+        }
+
+        async def set_indexes(create: bool):
+            async with db.engine.begin() as conn:
+                for index in indexes:
+                    await conn.run_sync(index.create if create else index.drop)
+
+        # Rounds alternate between both states so drift on a busy machine hits them alike.
+        samples = {state: {name: [] for name in queries} for state in ('before', 'after')}
+        for _ in range(7):
+            for state in ('before', 'after'):
+                await set_indexes(state == 'after')
+                for name, query in queries.items():
+                    start = time.perf_counter()
+                    await query()
+                    samples[state][name].append(time.perf_counter() - start)
+        before, after = [
+            {name: statistics.median(times) * 1000 for name, times in samples[state].items()}
+            for state in ('before', 'after')
+        ]
+        for name in queries:
+            print(f'{name:<50} {before[name]:>9.1f} ms -> {after[name]:>9.1f} ms')
+        await db.close()
+
+
+async def bench_groups(n: int):
+    """Selecting a campaign of every other profile from an id list versus from a profile group."""
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_mixed_profiles(db, n)
+        ids = list(range(1, n + 1, 2))
+        start = time.perf_counter()
+        await db.add_to_group('campaign', ids)
+        print(f'add {len(ids)} to group   {(time.perf_counter() - start) * 1000:>10.1f} ms')
+        await measure('get_profile_views (ids)', lambda: db.get_profile_views(ids), len(ids))
+        await measure('get_profile_views (group)', lambda: db.get_profile_views(group='campaign'), len(ids))
+        start = time.perf_counter()
+        ready_ids = set(await db.get_ready_profiles_ids_by_model(Twitter)) & set(ids)
+        print(f'ready ids & id list {(time.perf_counter() - start) * 1000:>10.1f} ms {len(ready_ids)} ids')
+        start = time.perf_counter()
+        ready_ids = await db.get_ready_profiles_ids_by_model(Twitter, group='campaign')
+        print(f'ready ids (group)   {(time.perf_counter() - start) * 1000:>10.1f} ms {len(ready_ids)} ids')
+        await db.close()
+
+
+async def bench_audit(n: int):
+    """Integrity audit of the mixed seed, whose shared proxies each serve two profiles against a limit of one."""
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_mixed_profiles(db, n)
+        await db.add_record([Proxy(proxy_string=f'spare{i}', proxy_type='shared') for i in range(n // 20)])
+        start = time.perf_counter()
+        violations = 0
+        async for batch in db.stream_violations():
+            violations += len(batch)
+        print(f'stream violations   {(time.perf_counter() - start) * 1000:>10.1f} ms {violations} violations')
+        for repair in (False, True, False):
+            report = await db.audit_integrity(repair=repair)
+            print(f'audit{" (repair)" if repair else "         "}      {report.elapsed * 1000:>10.1f} ms  {report}')
+        await db.close()
+
+
+async def bench_deposits(n: int):
+    """
+    Ingesting and linking two deposits for each of n / 10 Binance accounts, each owned by one profile,
+    then repairing and relinking deposits misdirected to another account.
+    """
+    from sqlalchemy import update
+
+    with TemporaryDirectory() as tmp:
+        db = DBHelper(f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}')
+        await seed_mixed_profiles(db, n)
+        accounts = n // 10
+        await db.add_record([
+            Binance(password='password', email=Email(login=f'binance{i}@mail.com', password='password'))
+            for i in range(accounts)
+        ])
+        # Odd profiles own an account, so every even profile is a wrong target for its neighbour's deposits.
+        await db.run_write(lambda session: session.execute(update(Profile), [
+            {'id': 2 * i + 1, 'binance_id': i + 1} for i in range(accounts)
+        ]))
+        start = time.perf_counter()
+        rows = linked = 0
+        for account_id in range(1, accounts + 1):
+            report = await db.ingest_deposits(Binance, account_id, [
+                {'evm': f'0x{account_id:038x}{j:02x}'} for j in range(2)
+            ])
+            rows += report.rows
+            linked += report.linked
+        elapsed = time.perf_counter() - start
+        print(f'ingest + link       {elapsed * 1000:>10.1f} ms {rows / elapsed:>8.0f} rows/sec {linked} linked')
+        audit = await db.audit_integrity(checks=('deposit_wrong_account',))
+        print(f'audit after ingest  {audit}')
+        if not audit.clean or linked != accounts:
+            raise RuntimeError(f'ingest_deposits linked {linked} of {accounts} accounts, {audit}')
+
+        # Account a owns deposits 2a - 1 (linked) and 2a (spare): point half the owners at the next account's spare.
+        misdirected = accounts // 2
+        await db.run_write(lambda session: session.execute(update(Profile), [
+            {'id': 2 * a - 1, 'binance_deposit_id': 2 * a + 2} for a in range(1, misdirected + 1)
+        ]))
+        audit = await db.audit_integrity(checks=('deposit_wrong_account',), repair=True)
+        print(f'audit (repair)      {audit}')
+        start = time.perf_counter()
+        relinked = 0
+        for account_id in range(1, misdirected + 1):
+            relinked += await db.link_deposits(Binance, account_id)
+        print(f'relink              {(time.perf_counter() - start) * 1000:>10.1f} ms {relinked} linked')
+        audit = await db.audit_integrity(checks=('deposit_wrong_account',))
+        print(f'audit after relink  {audit}')
+        if not audit.clean or relinked != misdirected:
+            raise RuntimeError(f'link_deposits relinked {relinked} of {misdirected} repaired profiles, {audit}')
+        await db.close()
+
+
+BENCHMARKS = {
+    'profile_views': bench_profile_views,
+    'startup': bench_startup,
+    'logging': bench_logging,
+    'wallet_generation': bench_wallet_generation,
+    'envelope': bench_envelope,
+    'token_refresh': bench_token_refresh,
+    'sqlite_writes': bench_sqlite_writes,
+    'write_behind': bench_write_behind,
+    'snapshot': bench_snapshot,
+    'export': bench_export,
+    'inventory': bench_inventory,
+    'filters': bench_filters,
+    'indexes': bench_indexes,
+    'groups': bench_groups,
+    'audit': bench_audit,
+    'deposits': bench_deposits,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmark', choices=BENCHMARKS)
+    parser.add_argument('-n', type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(BENCHMARKS[args.benchmark](args.n))
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sqlalchemy import event
+
+from benchmarks import seed_mixed_profiles
+from web3db import *
+from web3db.changes import Watermark
+from web3db.filters import ready, has, in_group, proxy_type, with_totp
+
+BASELINE = Path(__file__).with_name('query_plans.json')
+LARGE_TABLE_ROWS = 1000
+EXPLAINED = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT INTO')
+
+
+async def _collect(batches) -> list:
+    return [batch async for batch in batches]
+
+
+# DBHelper calls whose statements are explained, run in this order against one seeded database.
+# GPG-backed methods (create_profiles, create_data_key, reencrypt_secrets) need a keyring and are left out.
+CALLS = {
+    'get_row_by_id': lambda db: db.get_row_by_id(10, Profile),
+    'get_rows_by_id': lambda db: db.get_rows_by_id(list(range(1, 50)), Profile),
+    'get_rows_by_filter': lambda db: db.get_rows_by_filter(['twitter1', 'twitter2'], Twitter, Twitter.login),
+    'get_all_from_table': lambda db: db.get_all_from_table(Proxy, limit=100),
+    'get_row_by_login': lambda db: db.get_row_by_login('twitter1', Twitter),
+    'get_profiles_light_by_model': lambda db: db.get_profiles_light_by_model(Twitter, limit=100),
+    'get_profile_by_models_login': lambda db: db.get_profile_by_models_login(Twitter, 'twitter1'),
+    'get_random_profile': lambda db: db.get_random_profile(),
+    'get_random_profiles_by_proxy': lambda db: db.get_random_profiles_by_proxy(limit=10),
+    'get_random_profiles_ids_by_proxy': lambda db: db.get_random_profiles_ids_by_proxy(limit=10),
+    'get_ready_profiles_by_model': lambda db: db.get_ready_profiles_by_model(Twitter, limit=100),
+    'get_ready_profiles_ids_by_model': lambda db: db.get_ready_profiles_ids_by_model(Twitter),
+    'get_profile_views': lambda db: db.get_profile_views(list(range(1, 50))),
+    'get_ready_profile_views_by_model': lambda db: db.get_ready_profile_views_by_model(Twitter, limit=100),
+    'filter_profile_ids': lambda db: db.filter_profile_ids(
+        ready(Twitter) & has(Discord) & proxy_type('individual') & ~with_totp(Twitter)
+    ),
+    'filter_profile_ids(capabilities)': lambda db: db.filter_profile_ids(
+        ready(Twitter) & has(Discord), use_capabilities=True
+    ),
+    'add_to_group': lambda db: db.add_to_group('campaign', list(range(1, 1000, 2))),
+    'add_to_group(filter)': lambda db: db.add_to_group('ready', profile_filter=ready(Twitter)),
+    'get_group_ids': lambda db: db.get_group_ids('campaign'),
+    'get_groups': lambda db: db.get_groups(),
+    'get_profile_views(group)': lambda db: db.get_profile_views(group='campaign', limit=100),
+    'get_ready_profiles_ids_by_model(group)': lambda db: db.get_ready_profiles_ids_by_model(Twitter, group='campaign'),
+    'get_random_profiles_by_proxy(group)': lambda db: db.get_random_profiles_by_proxy(limit=10, group='campaign'),
+    'filter_profile_ids(group)': lambda db: db.filter_profile_ids(has(Discord) & in_group('ready'), group='campaign'),
+    'remove_from_group': lambda db: db.remove_from_group('campaign', [1, 3]),
+    'get_profiles_with_totp_by_model': lambda db: db.get_profiles_with_totp_by_model(Twitter, limit=100),
+    'get_unused_emails': lambda db: db.get_unused_emails(limit=100),
+    'get_unused_model': lambda db: db.get_unused_model(Twitter, limit=100),
+    'get_unused_proxies': lambda db: db.get_unused_proxies(limit=100),
+    'get_inventory': lambda db: db.get_inventory(),
+    'get_proxies_by_string': lambda db: db.get_proxies_by_string('proxy1'),
+    'get_profiles_with_shared_proxies': lambda db: db.get_profiles_with_shared_proxies(),
+    'get_not_used_emails': lambda db: db.get_not_used_emails([Profile, Twitter, Discord]),
+    'resolve_addresses': lambda db: db.resolve_addresses([f'0x{i:040x}' for i in range(20)]),
+    'get_changes': lambda db: db.get_changes(Profile, Watermark(datetime(2000, 1, 1), 0), limit=100),
+    'ingest_deposits': lambda db: db.ingest_deposits(
+        Binance, 1, [{'evm': f'0xdeposit{i}'} for i in range(20)], link=False
+    ),
+    'link_deposits': lambda db: db.link_deposits(Binance, 1),
+    'refresh_capabilities': lambda db: db.refresh_capabilities(),
+    'stream_violations': lambda db: _collect(db.stream_violations()),
+    'audit_integrity': lambda db: db.audit_integrity(repair=True),
+    'change_profile_model': lambda db: db.change_profile_model([5, 6], Twitter),
+    'archive_profiles': lambda db: db.archive_profiles([7, 8]),
+    'get_archived_rows': lambda db: db.get_archived_rows(Profile, [7, 8]),
+    'restore_profiles': lambda db: db.restore_profiles([7, 8]),
+    'delete_group': lambda db: db.delete_group('ready'),
+    'purge_tombstones': lambda db: db.purge_tombstones(datetime.utcnow() - timedelta(days=30)),
+}
+
+
+def normalize(sql: str) -> str:
+    """SQL with whitespace collapsed and expanded IN lists folded, so plans key on the statement shape."""
+    sql = ' '.join(sql.split())
+    return re.sub(r'\?(, \?)+', '?, ...', sql)
+
+
+def plan_flags(plan: list[str], row_counts: dict[str, int]) -> list[str]:
+    """
+    Problems in a SQLite query plan: full scans of large tables (a scan through an index is an ordered read,
+    not flagged), temp B-tree sorts and automatic indexes the planner had to build.
+    """
+    flags = []
+    for detail in plan:
+        if match := re.match(r'SCAN (\w+)$', detail):
+            table = re.sub(r'_\d+$', '', match.group(1))
+            if row_counts.get(table, 0) >= LARGE_TABLE_ROWS:
+                flags.append(f'full scan of {table}')
+        elif match := re.match(r'USE TEMP B-TREE FOR (.+)', detail):
+            flags.append(f'temp b-tree for {match.group(1)}')
+        elif match := re.search(r'USING AUTOMATIC (?:COVERING )?INDEX', detail):
+            flags.append(f'automatic index: {detail}')
+    return sorted(set(flags))
+
+
+async def capture(n: int) -> dict[str, list[dict]]:
+    """Runs CALLS against a fresh seeded SQLite database and explains every statement each call emitted."""
+    with TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'plans.db'
+        db = DBHelper(f'sqlite+aiosqlite:///{path}')
+        await seed_mixed_profiles(db, n)
+        await db.add_record(Binance(password='password', email=Email(login='binance@mail.com', password='password')))
+        statements: list[tuple[str, tuple]] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(EXPLAINED):
+                statements.append((statement, parameters[0] if executemany else parameters))
+
+        event.listen(db.engine.sync_engine, 'before_cursor_execute', record)
+        emitted = {}
+        for name, call in CALLS.items():
+            statements.clear()
+            await call(db)
+            emitted[name] = list(statements)
+        await db.close()
+
+        connection = sqlite3.connect(path)
+        row_counts = {
+            table: connection.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+            for (table,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        plans = {}
+        for name, calls in emitted.items():
+            seen = set()
+            plans[name] = []
+            for statement, parameters in calls:
+                sql = normalize(statement)
+                if sql in seen or sql.startswith('INSERT INTO') and 'SELECT' not in sql:
+                    continue
+                seen.add(sql)
+                try:
+                    plan = [row[3] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                except sqlite3.Error as e:
+                    plan = [f'not explained: {e}']
+                plans[name].append({'sql': sql, 'plan': plan, 'flags': plan_flags(plan, row_counts)})
+        connection.close()
+        return plans
+
+
+def regressions(plans: dict[str, list[dict]], baseline: dict[str, list[dict]]) -> list[str]:
+    """Flags of each statement that its baseline entry does not have; statements new to the baseline count in full."""
+    found = []
+    for name, statements in plans.items():
+        known = {statement['sql']: set(statement['flags']) for statement in baseline.get(name, [])}
+        for statement in statements:
+            new_flags = set(statement['flags']) - known.get(statement['sql'], set())
+            if new_flags:
+                found.append(f'{name}: {", ".join(sorted(new_flags))}\n    {statement["sql"]}')
+    return found
+
+
+def changed_plans(plans: dict[str, list[dict]], baseline: dict[str, list[dict]]) -> list[str]:
+    changed = []
+    for name, statements in plans.items():
+        known = {statement['sql']: statement['plan'] for statement in baseline.get(name, [])}
+        for statement in statements:
+            if statement['sql'] in known and known[statement['sql']] != statement['plan']:
+                changed.append(f'{name}: {known[statement["sql"]]} -> {statement["plan"]}')
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capture and check SQLite query plans of DBHelper statements.')
+    parser.add_argument('command', choices=('capture', 'check'), help='capture writes the baseline, check diffs it')
+    parser.add_argument('-n', type=int, default=2000, help='profiles to seed')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    args = parser.parse_args()
+    plans = asyncio.run(capture(args.n))
+    flagged = sum(bool(statement['flags']) for statements in plans.values() for statement in statements)
+    total = sum(len(statements) for statements in plans.values())
+    print(f'{total} statements from {len(plans)} calls explained, {flagged} flagged')
+    if args.command == 'capture':
+        args.baseline.write_text(json.dumps(plans, indent=2) + '\n')
+        print(f'Baseline written to {args.baseline}')
+        return
+    baseline = json.loads(args.baseline.read_text())
+    for change in changed_plans(plans, baseline):
+        print(f'plan changed: {change}')
+    for name in plans.keys() - baseline.keys():
+        print(f'not in baseline: {name}')
+    found = regressions(plans, baseline)
+    for regression in found:
+        print(f'REGRESSION {regression}')
+    if found:
+        print(f'{len(found)} plan regressions; fix the query or index, or re-capture the baseline if intended')
+        sys.exit(1)
+    print('No plan regressions')
+
+
+if __name__ == '__main__':
+    main()
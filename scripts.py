@@ -4,6 +4,7 @@ from pathlib import Path
 
 from web3db import *
 from web3db.core import create_db_instance
+from web3db.deposits import read_deposit_export
 
 data_folder = Path.cwd() / 'data'
 db = create_db_instance()
@@ -35,5 +36,11 @@ async def add_emails(file_name: str = 'emails.csv'):
         await db.add_record(emails)
 
 
+async def add_deposits(file_name: str, cex_model: type(Binance) | type(ByBit) | type(Okx) | type(Mexc) | type(Bitget),
+                       account_id: int):
+    report = await db.ingest_deposits(cex_model, account_id, read_deposit_export(data_folder / file_name))
+    print(report)
+
+
 if __name__ == '__main__':
     asyncio.run(add_emails())
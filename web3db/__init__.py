@@ -1,2 +1,8 @@
 from .core import DBHelper
 from .models import *
+from .views import ProfileView
+from .inventory import Inventory
+from .audit import AuditReport, Violation
+from .changes import Watermark, ChangeBatch
+from .sharding import ShardedDBHelper
+from .snapshot import ProfileSnapshot
@@ -0,0 +1,108 @@
+import re
+from typing import Iterable
+
+from sqlalchemy import Select
+from sqlalchemy.future import select
+
+from web3db.models import Profile, BinanceDeposit, ByBitDeposit, OkxDeposit, MexcDeposit, BitgetDeposit
+
+EVM = 'evm'
+APTOS = 'aptos'
+SOLANA = 'solana'
+BTC = 'btc'
+
+_EVM_RE = re.compile(r'^0x[0-9a-fA-F]{40}$')
+_APTOS_RE = re.compile(r'^0x[0-9a-fA-F]{1,64}$')
+_BTC_BECH32_RE = re.compile(r'^(bc1|tb1)[02-9ac-hj-np-z]{8,87}$', re.IGNORECASE)
+_BASE58_RE = re.compile(r'^[1-9A-HJ-NP-Za-km-z]{32,44}$')
+
+DEPOSIT_MODELS = {
+    BinanceDeposit: Profile.binance_deposit_id,
+    ByBitDeposit: Profile.bybit_deposit_id,
+    OkxDeposit: Profile.okx_deposit_id,
+    MexcDeposit: Profile.mexc_deposit_id,
+    BitgetDeposit: Profile.bitget_deposit_id,
+}
+PROFILE_ADDRESS_COLUMNS = {
+    EVM: [Profile.evm_address],
+    APTOS: [Profile.aptos_address],
+    SOLANA: [Profile.solana_address],
+    BTC: [Profile.btc_native_segwit_address, Profile.btc_taproot_address],
+}
+
+
+def address_kind(address: str) -> str | None:
+    if _EVM_RE.match(address):
+        return EVM
+    if _APTOS_RE.match(address):
+        return APTOS
+    if _BTC_BECH32_RE.match(address):
+        return BTC
+    if _BASE58_RE.match(address):
+        return SOLANA
+    return None
+
+
+def normalize_address(address: str) -> tuple[str, str] | tuple[None, None]:
+    """
+    Returns (kind, key) where key is the case-folded form used for comparison:
+    lowercase hex for EVM, zero-padded lowercase hex for Aptos, lowercase bech32
+    for BTC and the address itself for base58 Solana keys.
+    """
+    address = address.strip()
+    kind = address_kind(address)
+    if kind == EVM or kind == BTC:
+        return kind, address.lower()
+    if kind == APTOS:
+        return kind, '0x' + address[2:].lower().zfill(64)
+    if kind == SOLANA:
+        return kind, address
+    return None, None
+
+
+def stored_forms(kind: str, key: str) -> list[str]:
+    """Spellings a normalized address may be stored with."""
+    if kind == EVM:
+        from eth_utils import to_checksum_address
+        return [to_checksum_address(key), key]
+    return [key]
+
+
+def address_sources(kind: str) -> list[tuple[str, Select, object]]:
+    """(source column, column-only select of (address, profile_id), address column) for a chain."""
+    sources = [
+        (f'{Profile.__tablename__}.{column.key}', select(column, Profile.id), column)
+        for column in PROFILE_ADDRESS_COLUMNS[kind]
+    ]
+    if kind in (EVM, APTOS, SOLANA):
+        for deposit_model, profile_column in DEPOSIT_MODELS.items():
+            column = getattr(deposit_model, kind)
+            sources.append((
+                f'{deposit_model.__tablename__}.{kind}',
+                select(column, Profile.id).join(Profile, profile_column == deposit_model.id),
+                column
+            ))
+    return sources
+
+
+class AddressIndex:
+    """In-memory normalized address -> (profile_id, source column) map, loaded once with DBHelper.load_address_index."""
+
+    def __init__(self, entries: dict[str, tuple[int, str]] = None):
+        self.entries = entries or {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, address: str, profile_id: int, source: str):
+        _, key = normalize_address(address)
+        if key is not None:
+            self.entries.setdefault(key, (profile_id, source))
+
+    def resolve(self, addresses: Iterable[str]) -> dict[str, tuple[int, str]]:
+        resolved = {}
+        for address in addresses:
+            _, key = normalize_address(address)
+            if key is not None and key in self.entries:
+                resolved[address] = self.entries[key]
+        return resolved
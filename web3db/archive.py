@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import delete, insert, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from web3db.base import IN_CHUNK_SIZE
+from web3db.deposits import CEX_DEPOSITS
+from web3db.models import (
+    ARCHIVE_TABLES, ARCHIVED_GROUP_MEMBERS, Profile, Email, Twitter, Discord, Github, Binance, ByBit, Okx, Mexc,
+    Bitget, Tombstone, ProfileGroup, ProfileGroupMember
+)
+
+ACCOUNT_MODELS = (Twitter, Discord, Github, Binance, ByBit, Okx, Mexc, Bitget)
+DEPOSIT_MODELS = tuple(deposit_model for deposit_model, _ in CEX_DEPOSITS.values())
+EMAIL_MODELS = (Profile, *ACCOUNT_MODELS)
+# Hot tables are emptied referencing-side first so foreign keys hold at every statement, and refilled in reverse.
+DELETE_ORDER = (Profile, *DEPOSIT_MODELS, *ACCOUNT_MODELS, Email)
+
+
+@dataclass
+class ArchiveReport:
+    moved: dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def add(self, ids: dict[type, set[int]]):
+        for model, model_ids in ids.items():
+            if model_ids:
+                self.moved[model.__tablename__] = self.moved.get(model.__tablename__, 0) + len(model_ids)
+
+    def __str__(self):
+        moved = ', '.join(f'{count} {table}' for table, count in self.moved.items()) or 'nothing'
+        return f'moved {moved} in {self.elapsed:.2f}s'
+
+
+def _fk(model: type) -> str:
+    return f'{model.__name__.lower()}_id'
+
+
+def _chunks(ids: set[int]) -> list[list[int]]:
+    ids = sorted(ids)
+    return [ids[i:i + IN_CHUNK_SIZE] for i in range(0, len(ids), IN_CHUNK_SIZE)]
+
+
+async def _scalars(session: AsyncSession, query, column, values: set[int]) -> set[int]:
+    found = set()
+    for chunk in _chunks(values):
+        found.update((await session.execute(query.where(column.in_(chunk)))).scalars().all())
+    found.discard(None)
+    return found
+
+
+async def collect_hot(session: AsyncSession, profile_ids: list[int]) -> dict[type, set[int]]:
+    """
+    Ids of hot rows that leave with `profile_ids`: the profiles, their socials and CEX accounts, their deposits,
+    deposits of the CEX accounts that leave and the emails of all of these. CEX accounts whose deposits are
+    still linked to other profiles stay hot, and so do emails still referenced by a hot row.
+    """
+    table = Profile.__table__
+    fk_columns = [_fk(model) for model in ACCOUNT_MODELS] + [column.key for _, column in CEX_DEPOSITS.values()]
+    query = select(table.c.id, table.c.email_id, *[table.c[name] for name in fk_columns])
+    rows = (await session.execute(query.where(table.c.id.in_(profile_ids)))).all()
+    ids = {Profile: {row.id for row in rows}}
+    for model in ACCOUNT_MODELS:
+        ids[model] = {getattr(row, _fk(model)) for row in rows} - {None}
+    for cex, (deposit_model, deposit_column) in CEX_DEPOSITS.items():
+        account_column = getattr(deposit_model, _fk(cex))
+        ids[cex] -= await _scalars(
+            session,
+            select(account_column).join(Profile, deposit_column == deposit_model.id).where(
+                Profile.id.not_in(ids[Profile])
+            ),
+            account_column, ids[cex]
+        )
+        ids[deposit_model] = {getattr(row, deposit_column.key) for row in rows} - {None}
+        ids[deposit_model] |= await _scalars(session, select(deposit_model.id), account_column, ids[cex])
+    emails = {row.email_id for row in rows} - {None}
+    for model in ACCOUNT_MODELS:
+        emails |= await _scalars(session, select(model.email_id), model.id, ids[model])
+    for model in EMAIL_MODELS:
+        emails -= await _scalars(
+            session, select(model.email_id).where(model.id.not_in(ids[model])), model.email_id, emails
+        )
+    ids[Email] = emails
+    return ids
+
+
+async def collect_archived(session: AsyncSession, profile_ids: list[int]) -> dict[type, set[int]]:
+    """Ids of archived rows that come back with archived `profile_ids`, mirroring collect_hot."""
+    table = ARCHIVE_TABLES[Profile]
+    fk_columns = [_fk(model) for model in ACCOUNT_MODELS] + [column.key for _, column in CEX_DEPOSITS.values()]
+    query = select(table.c.id, table.c.email_id, *[table.c[name] for name in fk_columns])
+    rows = (await session.execute(query.where(table.c.id.in_(profile_ids)))).all()
+    ids = {Profile: {row.id for row in rows}}
+    for model in ACCOUNT_MODELS:
+        archived = ARCHIVE_TABLES[model]
+        ids[model] = await _scalars(
+            session, select(archived.c.id), archived.c.id, {getattr(row, _fk(model)) for row in rows} - {None}
+        )
+    for cex, (deposit_model, deposit_column) in CEX_DEPOSITS.items():
+        archived = ARCHIVE_TABLES[deposit_model]
+        own = {getattr(row, deposit_column.key) for row in rows} - {None}
+        ids[deposit_model] = await _scalars(session, select(archived.c.id), archived.c.id, own)
+        ids[deposit_model] |= await _scalars(session, select(archived.c.id), archived.c[_fk(cex)], ids[cex])
+    emails = {row.email_id for row in rows} - {None}
+    for model in ACCOUNT_MODELS:
+        archived = ARCHIVE_TABLES[model]
+        emails |= await _scalars(session, select(archived.c.email_id), archived.c.id, ids[model])
+    archived = ARCHIVE_TABLES[Email]
+    ids[Email] = await _scalars(session, select(archived.c.id), archived.c.id, emails)
+    return ids
+
+
+async def collect_unreferenced(session: AsyncSession, model: type, account_ids: list[int]) -> dict[type, set[int]]:
+    """Ids among `account_ids` of an account model or Email that no hot row references any more."""
+    ids = set(account_ids)
+    if model is Email:
+        for email_model in EMAIL_MODELS:
+            ids -= await _scalars(session, select(email_model.email_id), email_model.email_id, ids)
+        return {Email: ids}
+    profile_column = getattr(Profile, _fk(model))
+    ids -= await _scalars(session, select(profile_column), profile_column, ids)
+    if model in CEX_DEPOSITS:
+        account_column = getattr(CEX_DEPOSITS[model][0], _fk(model))
+        ids -= await _scalars(session, select(account_column), account_column, ids)
+    return {model: ids}
+
+
+async def collect_archived_accounts(session: AsyncSession, model: type, account_ids: list[int]) -> dict[type, set[int]]:
+    archived = ARCHIVE_TABLES[model]
+    return {model: await _scalars(session, select(archived.c.id), archived.c.id, set(account_ids))}
+
+
+async def move_to_archive(session: AsyncSession, ids: dict[type, set[int]]):
+    """Copies the rows into archive tables with INSERT ... SELECT, deletes them and records their tombstones."""
+    archived_at = datetime.utcnow()
+    for model, model_ids in ids.items():
+        source, target = model.__table__, ARCHIVE_TABLES[model]
+        names = [column.name for column in source.columns]
+        for chunk in _chunks(model_ids):
+            await session.execute(insert(target).from_select(
+                names + ['archived_at'],
+                select(*source.columns, literal(archived_at)).where(source.c.id.in_(chunk))
+            ))
+            await session.execute(insert(Tombstone), [
+                {'table_name': source.name, 'row_id': id_, 'deleted_at': archived_at} for id_ in chunk
+            ])
+    members = ProfileGroupMember.__table__
+    for chunk in _chunks(ids.get(Profile, set())):
+        await session.execute(insert(ARCHIVED_GROUP_MEMBERS).from_select(
+            [column.name for column in members.columns] + ['archived_at'],
+            select(*members.columns, literal(archived_at)).where(members.c.profile_id.in_(chunk))
+        ))
+        await session.execute(delete(members).where(members.c.profile_id.in_(chunk)))
+    for model in DELETE_ORDER:
+        for chunk in _chunks(ids.get(model, set())):
+            await session.execute(delete(model.__table__).where(model.__table__.c.id.in_(chunk)))
+
+
+async def move_from_archive(session: AsyncSession, ids: dict[type, set[int]]):
+    """
+    Copies archived rows back into the hot tables, bumping updated_at so change feeds pick them up.
+    Restored profiles rejoin the groups they were archived from, unless a group was deleted meanwhile.
+    """
+    restored_at = datetime.utcnow()
+    for model in reversed(DELETE_ORDER):
+        source, target = ARCHIVE_TABLES[model], model.__table__
+        names = [column.name for column in target.columns]
+        columns = [literal(restored_at) if name == 'updated_at' else source.c[name] for name in names]
+        for chunk in _chunks(ids.get(model, set())):
+            await session.execute(insert(target).from_select(names, select(*columns).where(source.c.id.in_(chunk))))
+    members, archived_members = ProfileGroupMember.__table__, ARCHIVED_GROUP_MEMBERS
+    for chunk in _chunks(ids.get(Profile, set())):
+        await session.execute(insert(members).from_select(
+            [column.name for column in members.columns],
+            select(*[archived_members.c[column.name] for column in members.columns]).where(
+                archived_members.c.profile_id.in_(chunk), archived_members.c.group_id.in_(select(ProfileGroup.id))
+            )
+        ))
+        await session.execute(delete(archived_members).where(archived_members.c.profile_id.in_(chunk)))
+    for model, model_ids in ids.items():
+        for chunk in _chunks(model_ids):
+            await session.execute(delete(ARCHIVE_TABLES[model]).where(ARCHIVE_TABLES[model].c.id.in_(chunk)))
@@ -0,0 +1,203 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+from sqlalchemy import Row, Select, and_, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from web3db.deposits import CEX_DEPOSITS
+from web3db.inventory import unused_proxies_query
+from web3db.models import Profile, Proxy, Twitter
+
+AUDIT_CHECKS = ('proxy_over_limit', 'email_reused', 'deposit_wrong_account')
+
+
+@dataclass(frozen=True, slots=True)
+class Violation:
+    check: str
+    table: str
+    row_id: int
+    detail: str
+
+    def __str__(self):
+        return f'{self.check}: {self.table} {self.row_id} {self.detail}'
+
+
+@dataclass
+class AuditReport:
+    violations: dict[str, int] = field(default_factory=dict)
+    repaired: dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def clean(self) -> bool:
+        return not any(self.violations.values())
+
+    def __str__(self):
+        def counts(values: dict[str, int]) -> str:
+            return ', '.join(f'{count} {check}' for check, count in values.items()) or 'none'
+
+        return f'violations: {counts(self.violations)}, repaired: {counts(self.repaired)} in {self.elapsed:.2f}s'
+
+
+def over_limit_proxies(proxy_limits: dict[str, int]) -> Select:
+    """
+    (proxy id, proxy_type, profiles) of proxies serving more profiles than `proxy_limits` allows their type.
+    Profiles are counted per proxy_id off its index before proxies are joined, and only proxies above the
+    smallest limit reach the join.
+    """
+    counts = (
+        select(Profile.proxy_id, func.count().label('profiles'))
+        .group_by(Profile.proxy_id)
+        .having(func.count() > min(proxy_limits.values()))
+        .subquery()
+    )
+    return (
+        select(Proxy.id, Proxy.proxy_type, counts.c.profiles)
+        .join(counts, counts.c.proxy_id == Proxy.id)
+        .where(or_(*[
+            and_(Proxy.proxy_type == proxy_type, counts.c.profiles > limit)
+            for proxy_type, limit in proxy_limits.items()
+        ]))
+        .order_by(Proxy.id)
+    )
+
+
+def excess_profiles(proxy_limits: dict[str, int]) -> Select:
+    """(profile id, proxy id, proxy_type) of profiles past the limit of an over-limit proxy; the oldest ones stay."""
+    over_limit = over_limit_proxies(proxy_limits).subquery()
+    ranked = (
+        select(
+            Profile.id, Profile.proxy_id, over_limit.c.proxy_type,
+            func.row_number().over(partition_by=Profile.proxy_id, order_by=Profile.id).label('rank')
+        )
+        .join(over_limit, over_limit.c.id == Profile.proxy_id)
+        .subquery()
+    )
+    return (
+        select(ranked.c.id, ranked.c.proxy_id, ranked.c.proxy_type)
+        .where(or_(*[
+            and_(ranked.c.proxy_type == proxy_type, ranked.c.rank > limit)
+            for proxy_type, limit in proxy_limits.items()
+        ]))
+        .order_by(ranked.c.id)
+    )
+
+
+def reused_emails() -> Select:
+    """(profile id, email id, twitter id) of profiles whose email is also the login email of a twitter."""
+    return (
+        select(Profile.id, Profile.email_id, Twitter.id.label('twitter_id'))
+        .join(Twitter, Twitter.email_id == Profile.email_id)
+        .order_by(Profile.id)
+    )
+
+
+def misdirected_deposits(cex: type) -> Select:
+    """
+    (profile id, deposit id, deposit's account id, profile's account id) of profiles linked to a `cex` deposit
+    that belongs to another account of that CEX than their own.
+    """
+    deposit_model, deposit_column = CEX_DEPOSITS[cex]
+    account_key = f'{cex.__name__.lower()}_id'
+    profile_account, deposit_account = getattr(Profile, account_key), getattr(deposit_model, account_key)
+    return (
+        select(Profile.id, deposit_column, deposit_account.label('deposit_account_id'), profile_account)
+        .select_from(deposit_model)
+        .join(Profile, deposit_column == deposit_model.id)
+        .where(or_(profile_account.is_(None), profile_account != deposit_account))
+        .order_by(Profile.id)
+    )
+
+
+def _proxy_violation(row: Row) -> Violation:
+    id_, proxy_type, profiles = row
+    return Violation('proxy_over_limit', Proxy.__tablename__, id_, f'{proxy_type} proxy used by {profiles} profiles')
+
+
+def _email_violation(row: Row) -> Violation:
+    id_, email_id, twitter_id = row
+    return Violation('email_reused', Profile.__tablename__, id_, f'email {email_id} is also on twitter {twitter_id}')
+
+
+def _deposit_violation(cex: type) -> Callable[[Row], Violation]:
+    name = cex.__name__.lower()
+
+    def to_violation(row: Row) -> Violation:
+        id_, deposit_id, deposit_account_id, account_id = row
+        return Violation(
+            'deposit_wrong_account', Profile.__tablename__, id_,
+            f'{name} deposit {deposit_id} belongs to {name} {deposit_account_id}, profile has {name} {account_id}'
+        )
+
+    return to_violation
+
+
+def audit_queries(checks: tuple[str, ...], proxy_limits: dict[str, int]) -> list[tuple[str, Select, Callable]]:
+    """(check, query, row to Violation) of every query behind `checks`, one per CEX for deposits."""
+    unknown = set(checks) - set(AUDIT_CHECKS)
+    if unknown:
+        raise ValueError(f'Unknown audit checks {sorted(unknown)}, expected some of {AUDIT_CHECKS}')
+    queries = []
+    if 'proxy_over_limit' in checks:
+        queries.append(('proxy_over_limit', over_limit_proxies(proxy_limits), _proxy_violation))
+    if 'email_reused' in checks:
+        queries.append(('email_reused', reused_emails(), _email_violation))
+    if 'deposit_wrong_account' in checks:
+        queries += [
+            ('deposit_wrong_account', misdirected_deposits(cex), _deposit_violation(cex)) for cex in CEX_DEPOSITS
+        ]
+    return queries
+
+
+def assign_free_slots(excess: list[Row], free: list[Row]) -> list[dict]:
+    """
+    Bulk UPDATE values moving `excess` profiles onto the (proxy id, proxy_type, free slots) in `free`, most free
+    first. Profiles left over when their proxy type runs out of slots keep their proxy.
+    """
+    slots: dict[str, list[int]] = {}
+    for id_, proxy_type, count in reversed(free):
+        slots.setdefault(proxy_type, []).extend([id_] * count)
+    values = []
+    for id_, _, proxy_type in excess:
+        if slots.get(proxy_type):
+            values.append({'id': id_, 'proxy_id': slots[proxy_type].pop()})
+    return values
+
+
+async def repair_proxies(session: AsyncSession, proxy_limits: dict[str, int]) -> list[int]:
+    """Moves profiles past their proxy's limit to free proxies of the same type and returns their ids."""
+    excess = (await session.execute(excess_profiles(proxy_limits))).all()
+    free = []
+    for proxy_type in {row.proxy_type for row in excess}:
+        unused = unused_proxies_query(proxy_limits).where(Proxy.proxy_type == proxy_type).subquery()
+        needed = sum(row.proxy_type == proxy_type for row in excess)
+        free += (await session.execute(
+            select(unused.c.id, unused.c.proxy_type, unused.c.count_1).order_by(unused.c.count_1.desc()).limit(needed)
+        )).all()
+    values = assign_free_slots(excess, free)
+    if values:
+        await session.execute(update(Profile), values)
+    return [value['id'] for value in values]
+
+
+async def repair_emails(session: AsyncSession) -> list[int]:
+    """Unlinks reused emails from profiles, leaving them to their twitters, and returns the profile ids."""
+    ids = [row.id for row in (await session.execute(reused_emails())).all()]
+    if ids:
+        await session.execute(update(Profile), [{'id': id_, 'email_id': None} for id_ in ids])
+    return ids
+
+
+async def repair_deposits(session: AsyncSession) -> list[int]:
+    """
+    Unlinks deposits of another CEX account from profiles, so DBHelper.link_deposits can link the right ones,
+    and returns the profile ids.
+    """
+    ids = []
+    for cex, (_, deposit_column) in CEX_DEPOSITS.items():
+        cex_ids = [row.id for row in (await session.execute(misdirected_deposits(cex))).all()]
+        if cex_ids:
+            await session.execute(update(Profile), [{'id': id_, deposit_column.key: None} for id_ in cex_ids])
+        ids += cex_ids
+    return ids
@@ -1,14 +1,44 @@
-from typing import Type
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Type, Callable, AsyncIterator
 
-from sqlalchemy import Select, Delete, Update, Result, delete, select, inspect, TextClause
+from sqlalchemy import (
+    Select, Delete, Update, Result, delete, select, inspect, TextClause, Table, Column, MetaData, insert,
+    ColumnElement
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase, selectinload
+from sqlalchemy.orm import DeclarativeBase, selectinload, undefer_group
+
+from web3db.buffer import WriteBehindBuffer
+from web3db.changes import (
+    CHANGE_FEED_LAG, Watermark, ChangeBatch, changes_query, tombstones_query, next_watermark
+)
+from web3db.groups import join_group
+from web3db.models import Profile
+from web3db.models.base import SECRETS_GROUP
+from web3db.models.tombstone import Tombstone
+from web3db.sqlite import configure_sqlite, GroupCommitWriter, WriteOperation
 from web3db.utils import my_logger
 
+IN_CHUNK_SIZE = 500
+TEMP_TABLE_THRESHOLD = 10_000
+
 
 class BaseDBHelper:
-    def __init__(self, url: str, engine_echo: bool = False, query_echo: bool = False):
+    def __init__(
+            self,
+            url: str,
+            engine_echo: bool = False,
+            query_echo: bool = False,
+            sqlite_mode: bool = False,
+            sqlite_pragmas: dict = None
+    ):
+        """
+        With `sqlite_mode` on a SQLite url, connections get WAL, synchronous=NORMAL and busy_timeout pragmas
+        (overridable through `sqlite_pragmas`) and all writes go through one GroupCommitWriter task.
+        """
         self.engine = create_async_engine(url=url, echo=engine_echo)
         self.session_factory = async_sessionmaker(
             bind=self.engine,
@@ -17,52 +47,115 @@ class BaseDBHelper:
             expire_on_commit=False
         )
         self.query_echo = query_echo
+        self.writer = None
+        self.write_buffer = None
+        if sqlite_mode and self.engine.dialect.name == 'sqlite':
+            configure_sqlite(self.engine, sqlite_pragmas)
+            self.writer = GroupCommitWriter(self.session_factory)
+
+    async def run_write(self, operation: WriteOperation):
+        """Runs `operation(session)` in a committed transaction, through the group-commit writer in SQLite mode."""
+        if self.writer is not None:
+            return await self.writer.submit(operation)
+        async with self.session_factory() as session:
+            result = await operation(session)
+            await session.commit()
+            return result
+
+    def enable_write_behind(
+            self, max_pending: int = 1000, flush_interval: float = 1.0, max_retries: int = 3
+    ) -> WriteBehindBuffer:
+        """
+        Opt-in buffer for high-frequency column updates (ready flags, passwords, tokens):
+        db.write_buffer.set(Twitter, id_, ready=True) or db.write_buffer.edit(twitter) instead of db.edit(twitter).
+        """
+        if self.write_buffer is None:
+            self.write_buffer = WriteBehindBuffer(self, max_pending, flush_interval, max_retries)
+        return self.write_buffer
+
+    async def close(self):
+        try:
+            if self.write_buffer is not None:
+                await self.write_buffer.close()
+        finally:
+            if self.writer is not None:
+                await self.writer.close()
+            await self.engine.dispose()
+
+    @staticmethod
+    def load_options(with_secrets: bool = False) -> list:
+        options = [selectinload('*')]
+        if with_secrets:
+            options.append(undefer_group(SECRETS_GROUP))
+        return options
+
+    def insert_ignore(self, model: type(DeclarativeBase)):
+        """INSERT that silently skips rows violating a unique constraint."""
+        if self.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects import postgresql
+            return postgresql.insert(model).on_conflict_do_nothing()
+        if self.engine.dialect.name == 'sqlite':
+            from sqlalchemy.dialects import sqlite
+            return sqlite.insert(model).on_conflict_do_nothing()
+        return insert(model).prefix_with('IGNORE')
 
     async def create_all_tables(self, base: Type[DeclarativeBase]):
+        """
+        Creates the current schema. The migrations start from a database that predates them, so mark a database
+        created here as up to date with `make stamp` (alembic stamp head) before running `make migrate` later.
+        """
         async with self.engine.begin() as conn:
             await conn.run_sync(base.metadata.create_all)
 
     async def add_record(self, record: type(DeclarativeBase) | list) -> type(DeclarativeBase) | None:
         if not record:
             if self.query_echo:
-                my_logger.info(f'Nothing to add. Record - {record}')
+                my_logger.info('Nothing to add. Record - {}', record)
             return
         if self.query_echo:
             if isinstance(record, list):
-                my_logger.info(f'Adding rows {[el.id for el in record]} in "{record[0].__tablename__}" table')
+                my_logger.info('Adding {} rows in "{}" table', len(record), record[0].__tablename__)
             else:
-                my_logger.info(f'Adding row with {record.id} id in "{record.__tablename__}" table')
-        async with self.session_factory() as session:
-            try:
-                if isinstance(record, list):
-                    session.add_all(record)
-                else:
-                    session.add(record)
-                await session.commit()
-                return record
-            except IntegrityError as e:
-                await session.rollback()
-                if self.query_echo:
-                    my_logger.debug(e)
+                my_logger.info('Adding row with {} id in "{}" table', record.id, record.__tablename__)
+
+        async def add(session):
+            if isinstance(record, list):
+                session.add_all(record)
+            else:
+                session.add(record)
+            await session.flush()
+            return record
+
+        try:
+            return await self.run_write(add)
+        except IntegrityError as e:
+            if self.query_echo:
+                my_logger.debug(e)
 
     async def execute_query(self, stmt: Select | Delete | Update | list[Select | Delete | Update] | TextClause) -> Result:
         if self.query_echo:
             my_logger.info(stmt)
-        async with self.session_factory() as session:
-            if not isinstance(stmt, list):
-                stmt = [stmt]
+        if not isinstance(stmt, list):
+            stmt = [stmt]
+
+        async def execute(session):
             for s in stmt:
                 result = await session.execute(s)
+            return result
+
+        if self.writer is not None and not all(isinstance(s, Select) for s in stmt):
+            return await self.run_write(execute)
+        async with self.session_factory() as session:
+            result = await execute(session)
             await session.commit()
             return result
 
     async def edit(self, edited_model: type(DeclarativeBase) | list) -> type(DeclarativeBase) | None:
         if self.query_echo:
             if isinstance(edited_model, list):
-                my_logger.info(
-                    f'Editing rows {[el.id for el in edited_model]} in "{edited_model[0].__tablename__}" table')
+                my_logger.info('Editing {} rows in "{}" table', len(edited_model), edited_model[0].__tablename__)
             else:
-                my_logger.info(f'Editing row with {edited_model.id} id in "{edited_model.__tablename__}" table')
+                my_logger.info('Editing row with {} id in "{}" table', edited_model.id, edited_model.__tablename__)
         return await self.add_record(edited_model)
 
     async def delete(self, models: type(DeclarativeBase) | list) -> None:
@@ -70,41 +163,186 @@ class BaseDBHelper:
             models = [models]
         ids = [model.id for model in models]
         if self.query_echo:
-            my_logger.info(f'Deleting rows with {", ".join(map(str, ids))} ids from "{models[0].__tablename__}" table')
-        query = delete(type(models[0])).where(type(models[0]).id.in_(ids))
-        await self.execute_query(query)
+            my_logger.info('Deleting {} rows from "{}" table', len(ids), models[0].__tablename__)
+        model = type(models[0])
+
+        async def delete_with_tombstones(session):
+            await session.execute(delete(model).where(model.id.in_(ids)))
+            if model is not Tombstone:
+                await session.execute(insert(Tombstone), [
+                    {'table_name': model.__tablename__, 'row_id': id_} for id_ in ids
+                ])
+
+        await self.run_write(delete_with_tombstones)
+
+    async def get_changes(
+            self,
+            model: type(DeclarativeBase),
+            since: Watermark = None,
+            limit: int = 1000,
+            with_secrets: bool = False,
+            lag: timedelta = CHANGE_FEED_LAG
+    ) -> ChangeBatch:
+        """
+        Up to `limit` rows of `model` changed after `since` in (updated_at, id) order, plus ids deleted after it,
+        read in one transaction. Rows are loaded without relationships. Pass batch.watermark to the next call.
+        Changes stamped within the last `lag` are left for a later call, so a transaction committing after the
+        watermark moved past its timestamps is not skipped (see changes.CHANGE_FEED_LAG).
+        """
+        since = since or Watermark()
+        horizon = datetime.utcnow() - lag
+        query = changes_query(model, since, limit, horizon)
+        if with_secrets:
+            query = query.options(undefer_group(SECRETS_GROUP))
+        async with self.session_factory() as session:
+            rows = (await session.execute(query)).scalars().all()
+            tombstones = (await session.execute(tombstones_query(model, since, limit, horizon))).all()
+        if self.query_echo:
+            my_logger.info(
+                'Got {} changed and {} deleted rows of "{}" table', len(rows), len(tombstones), model.__tablename__
+            )
+        return ChangeBatch(
+            list(rows), [tombstone.row_id for tombstone in tombstones], next_watermark(since, rows, tombstones),
+            has_more=len(rows) == limit or len(tombstones) == limit
+        )
+
+    async def stream_changes(
+            self, model: type(DeclarativeBase), since: Watermark = None, batch_size: int = 1000,
+            with_secrets: bool = False, lag: timedelta = CHANGE_FEED_LAG
+    ) -> AsyncIterator[ChangeBatch]:
+        """Yields change batches of `model` after `since` until the feed is drained up to `lag` ago."""
+        while True:
+            batch = await self.get_changes(model, since, batch_size, with_secrets, lag)
+            if batch:
+                yield batch
+            if not batch.has_more:
+                return
+            since = batch.watermark
+
+    async def purge_tombstones(self, before: datetime) -> None:
+        """Drops tombstones older than `before`; consumers with an older watermark must resync fully."""
+        await self.execute_query(delete(Tombstone).where(Tombstone.deleted_at < before))
 
-    async def get_all_from_table(self, model: type(DeclarativeBase), limit: int = None):
+    @staticmethod
+    def _join_group(query: Select, model: type(DeclarativeBase), group: str | None) -> Select:
+        """`query` narrowed to members of `group`, which only profiles belong to."""
+        if group is not None and model is not Profile:
+            raise ValueError(f'Only profiles belong to groups, not {model.__tablename__}')
+        return join_group(query, group)
+
+    async def get_all_from_table(
+            self, model: type(DeclarativeBase), limit: int = None, with_secrets: bool = False, group: str = None
+    ):
         if self.query_echo:
-            my_logger.info(f'Getting all rows from "{model.__tablename__}" table')
-        query = select(model).options(selectinload('*')).limit(limit).order_by(model.id)
+            my_logger.info('Getting all rows from "{}" table', model.__tablename__)
+        query = (
+            self._join_group(select(model), model, group)
+            .options(*self.load_options(with_secrets)).limit(limit).order_by(model.id)
+        )
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_row_by_id(self, id_: int, model: type(DeclarativeBase)) -> type(DeclarativeBase):
+    async def get_row_by_id(
+            self, id_: int, model: type(DeclarativeBase), with_secrets: bool = False
+    ) -> type(DeclarativeBase):
         if self.query_echo:
-            my_logger.info(f'Getting row with {id_} id from "{model.__tablename__}" table')
-        query = select(model).where(model.id == id_).options(selectinload('*'))
+            my_logger.info('Getting row with {} id from "{}" table', id_, model.__tablename__)
+        query = select(model).where(model.id == id_).options(*self.load_options(with_secrets))
         result = await self.execute_query(query)
         return result.scalars().first()
 
-    async def get_rows_by_id(self, ids: list[int], model: type(DeclarativeBase)) -> list[type(DeclarativeBase)]:
+    async def execute_in(
+            self,
+            build_query: Callable[[ColumnElement], Select],
+            column,
+            values: list,
+            scalars: bool = True
+    ) -> list:
+        """
+        Runs `build_query(column IN values)` for arbitrarily large `values`.
+        Up to IN_CHUNK_SIZE values go into one IN list, up to TEMP_TABLE_THRESHOLD
+        the IN lists are chunked and run concurrently, above that values are
+        loaded into a temporary table and matched by one IN (SELECT ...) statement.
+        Rows are returned in chunk order, duplicates of the input values removed.
+        """
+        values = list(dict.fromkeys(values))
+        if not values:
+            return []
+        if len(values) <= IN_CHUNK_SIZE:
+            return self._merge_results([await self.execute_query(build_query(column.in_(values)))], scalars)
+        if len(values) <= TEMP_TABLE_THRESHOLD:
+            results = await asyncio.gather(*[
+                self.execute_query(build_query(column.in_(values[i:i + IN_CHUNK_SIZE])))
+                for i in range(0, len(values), IN_CHUNK_SIZE)
+            ])
+            return self._merge_results(results, scalars)
+        return await self._execute_in_temp_table(build_query, column, values, scalars)
+
+    async def _execute_in_temp_table(
+            self,
+            build_query: Callable[[ColumnElement], Select],
+            column,
+            values: list,
+            scalars: bool
+    ) -> list:
+        temp_table = Table(
+            f'_in_values_{uuid.uuid4().hex[:12]}', MetaData(),
+            Column('value', column.type, primary_key=True),
+            prefixes=['TEMPORARY']
+        )
+        async with self.session_factory() as session:
+            connection = await session.connection()
+            await connection.run_sync(temp_table.create)
+            try:
+                await session.execute(insert(temp_table), [{'value': value} for value in values])
+                result = await session.execute(build_query(column.in_(select(temp_table.c.value))))
+                merged = self._merge_results([result], scalars)
+            finally:
+                await connection.run_sync(temp_table.drop)
+            await session.commit()
+        return merged
+
+    @staticmethod
+    def _merge_results(results: list[Result], scalars: bool) -> list:
+        merged = []
+        seen = set()
+        for result in results:
+            rows = result.scalars().unique().all() if scalars else result.all()
+            for row in rows:
+                if scalars:
+                    state = inspect(row, raiseerr=False)
+                    key = state.identity_key if state is not None else row
+                else:
+                    key = tuple(row)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(row)
+        return merged
+
+    async def get_rows_by_id(
+            self, ids: list[int], model: type(DeclarativeBase), with_secrets: bool = False, group: str = None
+    ) -> list[type(DeclarativeBase)]:
         if self.query_echo:
-            my_logger.info(f'Getting rows with {", ".join(map(str, ids))} ids from "{model.__tablename__}" table')
-        query = select(model).filter(model.id.in_(ids)).order_by(model.id).options(selectinload('*'))
-        result = await self.execute_query(query)
-        return result.scalars().unique().all()
+            my_logger.info('Getting {} rows by ids from "{}" table', len(ids), model.__tablename__)
+        query = self._join_group(select(model), model, group)
+        rows = await self.execute_in(
+            lambda clause: query.filter(clause).order_by(model.id).options(*self.load_options(with_secrets)),
+            model.id, ids
+        )
+        return sorted(rows, key=lambda row: row.id)
 
     async def get_rows_by_filter(
-            self, filter_value: list, model: type(DeclarativeBase), column
+            self, filter_value: list, model: type(DeclarativeBase), column, with_secrets: bool = False
     ) -> list[type(DeclarativeBase)]:
         if self.query_echo:
             my_logger.info(
-                f'Getting rows with {", ".join(map(str, filter_value))} from '
-                f'"{model.__tablename__}" table based on column {column.name}'
+                'Getting rows by {} values from "{}" table based on column {}',
+                len(filter_value), model.__tablename__, column.name
             )
         if column not in list(inspect(model).columns):
             raise ValueError(f"Column '{column}' not found in model '{model.__tablename__}'")
-        query = select(model).filter(column.in_(filter_value)).order_by(column).options(selectinload('*'))
-        result = await self.execute_query(query)
-        return result.scalars().unique().all()
+        rows = await self.execute_in(
+            lambda clause: select(model).filter(clause).order_by(column).options(*self.load_options(with_secrets)),
+            column, filter_value
+        )
+        return sorted(rows, key=lambda row: getattr(row, column.key))
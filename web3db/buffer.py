@@ -0,0 +1,193 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import inspect, update
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm.attributes import set_committed_value
+
+from web3db.utils.logger import my_logger
+
+
+@dataclass
+class BufferMetrics:
+    submitted: int = 0
+    written: int = 0
+    flushes: int = 0
+    queue_depth: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    total_flush_latency: float = 0.0
+    # values dropped after their row failed max_retries flushes
+    dead_letters: int = 0
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Column updates submitted per column value written."""
+        return self.submitted / self.written if self.written else 0.0
+
+    @property
+    def avg_flush_latency(self) -> float:
+        return self.total_flush_latency / self.flushes if self.flushes else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.submitted} submitted, {self.written} written ({self.coalescing_ratio:.1f}x coalesced), '
+            f'{self.flushes} flushes, depth {self.queue_depth}, {self.dead_letters} dead letters, '
+            f'flush latency avg {self.avg_flush_latency * 1000:.1f} ms max {self.max_flush_latency * 1000:.1f} ms'
+        )
+
+
+class WriteBehindError(RuntimeError):
+    pass
+
+
+class WriteBehindBuffer:
+    """
+    Queues column updates in memory, coalesced per (model, id, column) with the last write winning,
+    and writes them in batched UPDATE-by-primary-key statements when `max_pending` values are queued,
+    every `flush_interval` seconds and on close(). A failed batch is split until the failing rows are alone;
+    those are requeued and dropped as dead letters once they have failed `max_retries` flushes.
+    Created with DBHelper.enable_write_behind.
+    """
+
+    def __init__(self, db, max_pending: int = 1000, flush_interval: float = 1.0, max_retries: int = 3):
+        self.db = db
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.metrics = BufferMetrics()
+        self._pending: dict[type[DeclarativeBase], dict[int, dict]] = {}
+        self._failures: dict[tuple[type[DeclarativeBase], int], int] = {}
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    def set(self, model: type[DeclarativeBase], id_: int, **values):
+        """Queues `values` (column name -> value) for row `id_` of `model`."""
+        row = self._pending.setdefault(model, {}).setdefault(id_, {})
+        self.metrics.queue_depth += len(values.keys() - row.keys())
+        row.update(values)
+        self.metrics.submitted += len(values)
+        self._schedule()
+
+    def edit(self, records: DeclarativeBase | list[DeclarativeBase]):
+        """
+        Queues the column attributes changed on `records` since they were loaded or last queued, like a buffered
+        DBHelper.edit, and marks them as committed on the records.
+        """
+        if not isinstance(records, list):
+            records = [records]
+        for record in records:
+            state = inspect(record)
+            values = {
+                attr.key: attr.value for attr in state.attrs
+                if attr.key in state.mapper.columns and attr.history.added
+            }
+            if values:
+                self.set(type(record), record.id, **values)
+                for key, value in values.items():
+                    set_committed_value(record, key, value)
+
+    def _schedule(self):
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_periodically())
+        if self.metrics.queue_depth >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def _flush_periodically(self):
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> int:
+        """Writes everything queued so far and returns the number of column values written."""
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            self.metrics.queue_depth = 0
+            if not pending:
+                return 0
+            start = time.perf_counter()
+            rows = [(model, id_, values) for model, model_rows in pending.items() for id_, values in model_rows.items()]
+            written, failed = await self._write(rows)
+            failed_keys = {(model, id_) for model, id_, _, _ in failed}
+            for model, id_, _ in rows:
+                if (model, id_) not in failed_keys:
+                    self._failures.pop((model, id_), None)
+            for model, id_, values, error in failed:
+                self._fail(model, id_, values, error)
+            if not written:
+                return 0
+            latency = time.perf_counter() - start
+            self.metrics.flushes += 1
+            self.metrics.written += written
+            self.metrics.last_flush_latency = latency
+            self.metrics.max_flush_latency = max(self.metrics.max_flush_latency, latency)
+            self.metrics.total_flush_latency += latency
+            return written
+
+    async def _write(self, rows: list[tuple]) -> tuple[int, list[tuple]]:
+        """
+        Writes (model, id, values) `rows` in one transaction. A failed batch is halved and each half retried,
+        so a bad row costs O(log n) extra transactions and the rest still land. Returns the number of values
+        written and the (model, id, values, error) rows that failed on their own.
+        """
+        async def write(session):
+            by_model = {}
+            for model, id_, values in rows:
+                by_model.setdefault(model, []).append({'id': id_, **values})
+            for model, values in by_model.items():
+                await session.execute(update(model), values)
+
+        try:
+            await self.db.run_write(write)
+            return sum(len(values) for _, _, values in rows), []
+        except Exception as e:
+            if len(rows) == 1:
+                return 0, [(*rows[0], e)]
+        middle = len(rows) // 2
+        first_written, first_failed = await self._write(rows[:middle])
+        second_written, second_failed = await self._write(rows[middle:])
+        return first_written + second_written, first_failed + second_failed
+
+    def _fail(self, model: type[DeclarativeBase], id_: int, values: dict, error: Exception):
+        failures = self._failures.get((model, id_), 0) + 1
+        if failures >= self.max_retries:
+            self._failures.pop((model, id_), None)
+            self.metrics.dead_letters += len(values)
+            my_logger.error(
+                'Write-behind dropped {} values of {} {} after {} failed flushes: {}',
+                len(values), model.__tablename__, id_, failures, error
+            )
+            return
+        self._failures[(model, id_)] = failures
+        my_logger.warning('Write-behind update of {} {} failed, requeueing: {}', model.__tablename__, id_, error)
+        self._requeue({model: {id_: values}})
+
+    def _requeue(self, pending: dict):
+        for model, rows in pending.items():
+            for id_, values in rows.items():
+                row = self._pending.setdefault(model, {}).setdefault(id_, {})
+                for column, value in values.items():
+                    if column not in row:
+                        row[column] = value
+                        self.metrics.queue_depth += 1
+
+    async def close(self):
+        """
+        Stops the flush timer and writes everything still queued, retrying failed rows up to `max_retries`
+        flushes. Raises WriteBehindError if any of it could not be written.
+        """
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        dead_letters = self.metrics.dead_letters
+        for attempt in range(self.max_retries):
+            if attempt:
+                await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if not self._pending:
+                break
+        lost = self.metrics.dead_letters - dead_letters + self.metrics.queue_depth
+        if lost:
+            raise WriteBehindError(f'Write-behind buffer closed with {lost} values it could not write')
@@ -0,0 +1,74 @@
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.future import select
+
+from web3db.models.tombstone import Tombstone
+
+# updated_at and deleted_at are stamped by the writer before its transaction commits, so a row can become visible
+# with a timestamp older than a watermark already handed out. The feed only reads rows stamped at least this long
+# ago; it has to exceed the longest write transaction plus the clock skew between writers.
+CHANGE_FEED_LAG = timedelta(seconds=10)
+
+
+@dataclass(slots=True, frozen=True)
+class Watermark:
+    """
+    Position in a model's change feed: the last seen (updated_at, id) of changed rows
+    and (deleted_at, id) of its tombstones. The default watermark starts from the beginning.
+    """
+    updated_at: datetime | None = None
+    id: int = 0
+    deleted_at: datetime | None = None
+    tombstone_id: int = 0
+
+
+@dataclass(slots=True)
+class ChangeBatch:
+    rows: list = field(default_factory=list)
+    deleted_ids: list[int] = field(default_factory=list)
+    watermark: Watermark = field(default_factory=Watermark)
+    has_more: bool = False
+
+    def __len__(self):
+        return len(self.rows) + len(self.deleted_ids)
+
+
+def after(timestamp_column, id_column, timestamp: datetime | None, id_: int):
+    """(timestamp, id) > (`timestamp`, `id_`) spelled so the (timestamp, id) index serves it on every dialect."""
+    if timestamp is None:
+        return timestamp_column.isnot(None)
+    return and_(timestamp_column >= timestamp, or_(timestamp_column > timestamp, id_column > id_))
+
+
+def changes_query(model, since: Watermark, limit: int, horizon: datetime) -> Select:
+    """Rows of `model` changed after `since` and stamped no later than `horizon`."""
+    return (
+        select(model)
+        .where(after(model.updated_at, model.id, since.updated_at, since.id), model.updated_at <= horizon)
+        .order_by(model.updated_at, model.id)
+        .limit(limit)
+    )
+
+
+def tombstones_query(model, since: Watermark, limit: int, horizon: datetime) -> Select:
+    return (
+        select(Tombstone.id, Tombstone.row_id, Tombstone.deleted_at)
+        .where(
+            Tombstone.table_name == model.__tablename__,
+            after(Tombstone.deleted_at, Tombstone.id, since.deleted_at, since.tombstone_id),
+            Tombstone.deleted_at <= horizon
+        )
+        .order_by(Tombstone.deleted_at, Tombstone.id)
+        .limit(limit)
+    )
+
+
+def next_watermark(since: Watermark, rows: list, tombstones: list) -> Watermark:
+    watermark = since
+    if rows:
+        watermark = replace(watermark, updated_at=rows[-1].updated_at, id=rows[-1].id)
+    if tombstones:
+        watermark = replace(watermark, deleted_at=tombstones[-1].deleted_at, tombstone_id=tombstones[-1].id)
+    return watermark
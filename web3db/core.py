@@ -1,20 +1,37 @@
 import random
-import base58
-from typing import Union
-from mnemonic import Mnemonic
-from eth_account import Account as EVMAccount
-from aptos_sdk.account import Account as AptosAccount
-from solders.keypair import Keypair
-from bitcoinutils.hdwallet import HDWallet
-from bitcoinutils.setup import setup
-from sqlalchemy import func, and_, not_, desc, case, Select, union
+import time
+from typing import Union, Callable, AsyncIterator
+from sqlalchemy import func, and_, or_, delete, insert, Select, union, update, RowMapping
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, undefer_group
 
-from web3db.base import BaseDBHelper
+from web3db.addresses import AddressIndex, normalize_address, stored_forms, address_sources, EVM, APTOS, SOLANA, BTC
+from web3db.archive import (
+    ArchiveReport, collect_hot, collect_archived, collect_unreferenced, collect_archived_accounts, move_to_archive,
+    move_from_archive
+)
+from web3db.audit import (
+    AUDIT_CHECKS, AuditReport, Violation, audit_queries, repair_deposits, repair_emails, repair_proxies
+)
+from web3db.base import BaseDBHelper, IN_CHUNK_SIZE
+from web3db.deposits import CEX_DEPOSITS, DEPOSIT_COLUMNS, DepositIngestReport, split_deposit_rows
+from web3db.export import DEFAULT_EXPORT_COLUMNS, ExportReport, stream_export
+from web3db.filters import ProfileFilter, capabilities_value, filter_query
+from web3db.groups import group_id, join_group, members_query
+from web3db.inventory import (
+    Inventory, inventory_query, to_inventory, unused_emails_filter, unused_model_filter, unused_proxies_query
+)
 from web3db.models import *
+from web3db.models.base import SECRETS_GROUP
+from web3db.models.email import not_ru_login
 from web3db.utils import my_logger
-from web3db.utils.encrypt_private import encrypt
+from web3db.utils.encrypt_private import DecryptionError, encrypt, decrypt
+from web3db.utils.envelope import ENVELOPE_PREFIX, DataKeyRing, generate_data_key, is_envelope
+from web3db.snapshot import write_snapshot
+from web3db.views import ProfileView, profile_view_query, to_profile_views
+from web3db.wallets import (
+    CHAINS, HDKeychain, generate_random_wallets, apply_wallets, wallet_columns, gpg_encryptor
+)
 
 ModelType = Union[type(Email), type(Discord), type(Twitter), type(Github), type(Proxy), type(Profile)]
 EmailUsedModelType = Union[
@@ -22,10 +39,14 @@ EmailUsedModelType = Union[
 ]
 INDIVIDUAL_PROXY_LIMIT = 3
 SHARED_PROXY_LIMIT = 1
-setup('mainnet')
+PROXY_LIMITS = {'individual': INDIVIDUAL_PROXY_LIMIT, 'shared': SHARED_PROXY_LIMIT}
 
 
 class DBHelper(BaseDBHelper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._inventory: tuple[float, Inventory] | None = None
+
     async def get_row_by_login(self, login: str, model) -> ModelType | None:
         if model == Proxy:
             query = select(model).where(model.proxy_string == login).options(selectinload('*'))
@@ -38,64 +59,73 @@ class DBHelper(BaseDBHelper):
             self,
             model: ModelType,
             ids: list[int] = None,
-            limit: int = None
+            limit: int = None,
+            group: str = None
     ) -> list[tuple[int, str, bool]]:
-        my_logger.info(f'Getting profiles by id (light with model)')
-        query = (
+        my_logger.info('Getting profiles by id (light with model)')
+        query = join_group(
             select(Profile.id, model.proxy_string if model == Proxy else model.login, model.ready)
-            .join(model).order_by(Profile.id)
+            .join(model).order_by(Profile.id),
+            group
         )
         if ids:
             query = query.filter(Profile.id.in_(ids))
         result = await self.execute_query(query.limit(limit))
         return [tuple(el) for el in result.all()]
 
-    async def get_profile_by_models_login(self, model: ModelType, login: str) -> Profile:
-        my_logger.info(f'Getting {model.__name__} by login - {login}')
-        query = select(Profile).where(model.login == login).options(selectinload('*'))
+    async def get_profile_by_models_login(
+            self, model: ModelType, login: str, with_secrets: bool = False, group: str = None
+    ) -> Profile:
+        my_logger.info('Getting {} by login - {}', model.__name__, login)
+        query = (
+            join_group(select(Profile).join(model), group)
+            .where(model.login == login).options(*self.load_options(with_secrets))
+        )
         result = await self.execute_query(query)
         return result.scalars().first()
 
-    async def get_random_profile(self) -> Profile:
-        my_logger.info(f'Getting random profile')
-        query = select(Profile).order_by(func.random()).options(selectinload('*'))
+    async def get_random_profile(self, with_secrets: bool = False, group: str = None) -> Profile:
+        my_logger.info('Getting random profile')
+        query = join_group(select(Profile), group).order_by(func.random()).options(*self.load_options(with_secrets))
         result = await self.execute_query(query)
         return result.scalars().first()
 
-    async def get_random_profiles_by_proxy(self, limit: int = None) -> list[Profile]:
-        my_logger.info(f'Getting random profiles by proxy')
-        subquery = (
+    async def get_random_profiles_by_proxy(
+            self, limit: int = None, with_secrets: bool = False, group: str = None
+    ) -> list[Profile]:
+        my_logger.info('Getting random profiles by proxy')
+        subquery = join_group(
             select(
                 func.row_number().over(
                     partition_by=Profile.proxy_id,
                     order_by=func.random()
                 ).label('rn'),
                 Profile
-            )
-            .alias('subquery')
-        )
+            ),
+            group
+        ).alias('subquery')
         query = (
             select(Profile)
             .join(subquery, subquery.c.id == Profile.id)
             .where(subquery.c.rn == 1)
-            .options(selectinload('*'))
+            .options(*self.load_options(with_secrets))
             .limit(limit)
         )
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_random_profiles_ids_by_proxy(self, limit: int = None) -> list[int]:
-        my_logger.info(f'Getting random profiles by proxy (light with social)')
-        subquery = (
+    async def get_random_profiles_ids_by_proxy(self, limit: int = None, group: str = None) -> list[int]:
+        my_logger.info('Getting random profiles by proxy (light with social)')
+        subquery = join_group(
             select(
                 func.row_number().over(
                     partition_by=Profile.proxy_id,
                     order_by=func.random()
                 ).label('rn'),
                 Profile
-            )
-            .alias('subquery')
-        )
+            ),
+            group
+        ).alias('subquery')
         query = (
             select(Profile.id)
             .join(Proxy)
@@ -106,30 +136,235 @@ class DBHelper(BaseDBHelper):
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_ready_profiles_by_model(self, model: ModelType, limit: int = None) -> list[Profile]:
-        my_logger.info(f'Getting ready {model.__name__.lower()} profiles')
+    async def get_ready_profiles_by_model(
+            self, model: ModelType, limit: int = None, with_secrets: bool = False, group: str = None
+    ) -> list[Profile]:
+        my_logger.info('Getting ready {} profiles', model.__name__.lower())
         query = (
-            select(Profile).join(model).where(model.ready).options(selectinload('*')).limit(limit).order_by(Profile.id)
+            join_group(select(Profile).join(model), group).where(model.ready)
+            .options(*self.load_options(with_secrets)).limit(limit).order_by(Profile.id)
         )
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_ready_profiles_ids_by_model(self, model: ModelType, limit: int = None) -> list[int]:
-        my_logger.info(f'Getting ready {model.__name__.lower()} profiles (light with social)')
-        query = select(Profile.id).join(model).where(model.ready).limit(limit)
+    async def get_ready_profiles_ids_by_model(
+            self, model: ModelType, limit: int = None, group: str = None
+    ) -> list[int]:
+        my_logger.info('Getting ready {} profiles (light with social)', model.__name__.lower())
+        query = join_group(select(Profile.id).join(model), group).where(model.ready).limit(limit)
+        result = await self.execute_query(query)
+        return result.scalars().all()
+
+    async def get_profile_views(
+            self, ids: list[int] = None, limit: int = None, group: str = None
+    ) -> list[ProfileView]:
+        my_logger.info('Getting profile views')
+        if ids:
+            rows = await self.execute_in(
+                lambda clause: join_group(profile_view_query(), group).where(clause).order_by(Profile.id),
+                Profile.id, ids, scalars=False
+            )
+            return sorted(to_profile_views(rows), key=lambda view: view.id)[:limit]
+        result = await self.execute_query(join_group(profile_view_query(), group).order_by(Profile.id).limit(limit))
+        return to_profile_views(result.all())
+
+    async def get_ready_profile_views_by_model(
+            self, model: ModelType, limit: int = None, group: str = None
+    ) -> list[ProfileView]:
+        my_logger.info('Getting ready {} profile views', model.__name__.lower())
+        query = join_group(profile_view_query(), group).where(model.ready).order_by(Profile.id).limit(limit)
+        result = await self.execute_query(query)
+        return to_profile_views(result.all())
+
+    async def filter_profile_ids(
+            self, profile_filter: ProfileFilter, limit: int = None, use_capabilities: bool = False, group: str = None
+    ) -> list[int]:
+        """
+        Ids of profiles matching `profile_filter`, e.g. ready(Twitter) & has(Discord) & proxy_type('individual'),
+        in one query. With `use_capabilities` flagged predicates are read from Profile.capabilities.
+        """
+        my_logger.info('Getting profile ids by filter {}', profile_filter)
+        query = filter_query(profile_filter, join_group(select(Profile.id), group), use_capabilities).limit(limit)
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_profiles_with_totp_by_model(self, model: ModelType, limit: int = None) -> list[Profile]:
-        my_logger.info(f'Getting {model.__name__.lower()} profiles with totp (light with social)')
+    async def filter_profile_views(
+            self, profile_filter: ProfileFilter, limit: int = None, use_capabilities: bool = False, group: str = None
+    ) -> list[ProfileView]:
+        my_logger.info('Getting profile views by filter {}', profile_filter)
+        query = filter_query(profile_filter, join_group(profile_view_query(), group), use_capabilities).limit(limit)
+        result = await self.execute_query(query)
+        return to_profile_views(result.all())
+
+    async def filter_profiles(
+            self,
+            profile_filter: ProfileFilter,
+            limit: int = None,
+            with_secrets: bool = False,
+            use_capabilities: bool = False,
+            group: str = None
+    ) -> list[Profile]:
+        my_logger.info('Getting profiles by filter {}', profile_filter)
         query = (
-            select(Profile)
-            .join(model)
+            filter_query(profile_filter, join_group(select(Profile), group), use_capabilities)
+            .options(*self.load_options(with_secrets)).limit(limit)
+        )
+        result = await self.execute_query(query)
+        return result.scalars().all()
+
+    async def stream_profile_views(
+            self,
+            profile_filter: ProfileFilter,
+            batch_size: int = 10_000,
+            use_capabilities: bool = False,
+            group: str = None
+    ) -> AsyncIterator[list[ProfileView]]:
+        """Yields views of profiles matching `profile_filter` from a server-side cursor, `batch_size` at a time."""
+        query = filter_query(profile_filter, join_group(profile_view_query(), group), use_capabilities)
+        async with self.session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            async for partition in result.partitions(batch_size):
+                yield to_profile_views(partition)
+
+    async def refresh_capabilities(self, ids: list[int] = None) -> int:
+        """
+        Recomputes Profile.capabilities from the linked rows, of `ids` or of all profiles, in set-based UPDATEs
+        that only touch rows whose bits changed, and returns their count. Call it after linking accounts
+        or changing ready flags when filters run with use_capabilities.
+        """
+        my_logger.info('Refreshing capabilities of {} profiles', len(ids) if ids else 'all')
+        value = capabilities_value()
+        statement = (
+            update(Profile).where(Profile.capabilities != value).values(capabilities=value)
+            .execution_options(synchronize_session=False)
+        )
+        statements = (
+            [statement.where(Profile.id.in_(ids[i:i + IN_CHUNK_SIZE])) for i in range(0, len(ids), IN_CHUNK_SIZE)]
+            if ids else [statement]
+        )
+
+        async def refresh(session):
+            return sum([(await session.execute(chunk)).rowcount for chunk in statements])
+
+        return await self.run_write(refresh)
+
+    async def create_group(self, name: str) -> ProfileGroup:
+        """The profile group called `name`, created if it does not exist yet."""
+        await self.run_write(lambda session: session.execute(self.insert_ignore(ProfileGroup).values(name=name)))
+        result = await self.execute_query(select(ProfileGroup).where(ProfileGroup.name == name))
+        return result.scalars().first()
+
+    async def add_to_group(
+            self,
+            group: str,
+            ids: list[int] = None,
+            profile_filter: ProfileFilter = None,
+            chunk_size: int = IN_CHUNK_SIZE
+    ) -> int:
+        """
+        Adds profiles to `group`, creating it if needed, and returns how many were not members yet. Members are
+        inserted with INSERT ... SELECT from profiles, per `chunk_size` of `ids` or in one statement for all
+        profiles matching `profile_filter`, so unknown ids and existing members are skipped.
+        """
+        if ids is None and profile_filter is None:
+            raise ValueError('Pass ids or a profile_filter to add to the group')
+        await self.create_group(group)
+        source = select(group_id(group), Profile.id)
+        if profile_filter is not None:
+            selects = [filter_query(profile_filter, source).order_by(None)]
+        else:
+            selects = [source.where(Profile.id.in_(ids[i:i + chunk_size])) for i in range(0, len(ids), chunk_size)]
+        statement = self.insert_ignore(ProfileGroupMember)
+
+        async def add(session):
+            return sum([
+                (await session.execute(statement.from_select(['group_id', 'profile_id'], select_))).rowcount
+                for select_ in selects
+            ])
+
+        added = await self.run_write(add)
+        my_logger.info('Added {} profiles to group {}', added, group)
+        return added
+
+    async def remove_from_group(self, group: str, ids: list[int] = None, chunk_size: int = IN_CHUNK_SIZE) -> int:
+        """Removes `ids` (every member if None) from `group` and returns how many were removed."""
+        statement = delete(ProfileGroupMember).where(ProfileGroupMember.group_id == group_id(group))
+        statements = (
+            [
+                statement.where(ProfileGroupMember.profile_id.in_(ids[i:i + chunk_size]))
+                for i in range(0, len(ids), chunk_size)
+            ]
+            if ids is not None else [statement]
+        )
+
+        async def remove(session):
+            return sum([(await session.execute(chunk)).rowcount for chunk in statements])
+
+        removed = await self.run_write(remove)
+        my_logger.info('Removed {} profiles from group {}', removed, group)
+        return removed
+
+    async def get_group_ids(self, group: str, limit: int = None) -> list[int]:
+        my_logger.info('Getting profile ids of group {}', group)
+        result = await self.execute_query(members_query(group).limit(limit))
+        return result.scalars().all()
+
+    async def get_groups(self) -> list[tuple[ProfileGroup, int]]:
+        """Every profile group with its member count."""
+        query = (
+            select(ProfileGroup, func.count(ProfileGroupMember.profile_id))
+            .outerjoin(ProfileGroupMember, ProfileGroupMember.group_id == ProfileGroup.id)
+            .group_by(ProfileGroup.id).order_by(ProfileGroup.name)
+        )
+        result = await self.execute_query(query)
+        return [tuple(row) for row in result.all()]
+
+    async def delete_group(self, group: str) -> None:
+        """Deletes `group` and its memberships, archived ones included; the profiles stay."""
+        my_logger.info('Deleting group {}', group)
+
+        async def delete_with_members(session):
+            id_ = (await session.execute(select(ProfileGroup.id).where(ProfileGroup.name == group))).scalar()
+            if id_ is None:
+                return
+            await session.execute(delete(ProfileGroupMember).where(ProfileGroupMember.group_id == id_))
+            await session.execute(delete(ARCHIVED_GROUP_MEMBERS).where(ARCHIVED_GROUP_MEMBERS.c.group_id == id_))
+            await session.execute(delete(ProfileGroup).where(ProfileGroup.id == id_))
+            await session.execute(insert(Tombstone).values(table_name=ProfileGroup.__tablename__, row_id=id_))
+
+        await self.run_write(delete_with_members)
+
+    async def export_snapshot(self, path: str, chunk_size: int = 10_000) -> int:
+        """Writes the read-only ProfileSnapshot file workers open instead of querying profile views."""
+        my_logger.info('Exporting profile snapshot to {}', path)
+        return await write_snapshot(self, path, chunk_size)
+
+    async def export_rows(
+            self,
+            path: str,
+            model: ModelType = Profile,
+            columns: list[str] = DEFAULT_EXPORT_COLUMNS,
+            format: str = None,
+            batch_size: int = 10_000
+    ) -> ExportReport:
+        """Streams chosen columns of `model` and its accounts into a CSV, Parquet or Arrow file in constant memory."""
+        report = await stream_export(self, path, model, columns, format, batch_size)
+        my_logger.info('Export: {}', report)
+        return report
+
+    async def get_profiles_with_totp_by_model(
+            self, model: ModelType, limit: int = None, with_secrets: bool = False, group: str = None
+    ) -> list[Profile]:
+        my_logger.info('Getting {} profiles with totp (light with social)', model.__name__.lower())
+        query = (
+            join_group(select(Profile).join(model), group)
             .where(model.totp_secret != None)
             .options(selectinload(getattr(Profile, model.__name__.lower())))
             .limit(limit)
             .order_by(Profile.id)
         )
+        if with_secrets:
+            query = query.options(undefer_group(SECRETS_GROUP))
         result = await self.execute_query(query)
         return result.scalars().all()
 
@@ -157,49 +392,199 @@ class DBHelper(BaseDBHelper):
             self,
             recipient: str,
             passphrase: str,
-            limit: int = None
+            limit: int = None,
+            master_seed: str = None,
+            chains: list[str] = None,
+            envelope: bool = False,
+            group: str = None
     ) -> list[Profile]:
+        """
+        Creates profiles from unused proxies, emails, discords and twitters with wallets of `chains`
+        (names registered in wallets.CHAINS, all by default); fill_missing_chains adds the rest later.
+        By default every wallet gets fresh random keys stored as an encrypted secret: an armored PGP message,
+        or with `envelope` an AES-GCM blob under one new data key for the whole batch (see create_data_key).
+        With `master_seed` (the encrypted BIP-39 master mnemonic) keys are HD-derived instead:
+        profiles only store their `derivation_index` and keys are recovered with wallets.derive_profile_wallets.
+        With `group` the new profiles are added to that group.
+        """
         potential_profiles = await self.get_potential_profiles(limit)
-        for i, profile in enumerate(potential_profiles):
-            evm_account, evm_mnemo = EVMAccount.create_with_mnemonic()
-            aptos_account = AptosAccount.generate()
-            solana_keypair = Keypair()
-            btc_mnemo = Mnemonic().generate(256)
-            btc_hdwallet = HDWallet(mnemonic=btc_mnemo)
-            profile.evm_private = encrypt(evm_account.key.hex(), recipient, passphrase)
-            profile.evm_address = evm_account.address
-            profile.aptos_private = encrypt(aptos_account.private_key.hex(), recipient, passphrase)
-            profile.aptos_address = str(aptos_account.address())
-            profile.solana_private = encrypt(
-                base58.b58encode(solana_keypair.secret() + bytes(solana_keypair.pubkey())).decode(),
-                recipient, passphrase
-            )
-            profile.solana_address = str(solana_keypair.pubkey())
-            profile.btc_mnemo = encrypt(btc_mnemo, recipient, passphrase)
-            btc_hdwallet.from_path("m/84'/0'/0'/0/0")
-            profile.btc_native_segwit_address = (
-                btc_hdwallet.get_private_key().get_public_key().get_segwit_address().to_string()
-            )
-            btc_hdwallet.from_path("m/86'/0'/0'/0/0")
-            profile.btc_taproot_address = (
-                btc_hdwallet.get_private_key().get_public_key().get_taproot_address().to_string()
-            )
+        if master_seed is not None:
+            keychain = HDKeychain(decrypt(master_seed, passphrase, strict=True))
+            next_index = await self._next_derivation_index()
+            for i, profile in enumerate(potential_profiles):
+                profile.derivation_index = next_index + i
+                apply_wallets(profile, keychain.derive(profile.derivation_index, chains))
+        else:
+            encrypt_secret = await self._secret_encryptor(recipient, passphrase, envelope)
+            for profile in potential_profiles:
+                apply_wallets(profile, generate_random_wallets(chains), encrypt_secret)
         result = await self.add_record(potential_profiles)
+        if result and group is not None:
+            await self.add_to_group(group, ids=[profile.id for profile in result])
         return result
 
+    async def _secret_encryptor(self, recipient: str, passphrase: str, envelope: bool) -> Callable[[str], str]:
+        if not envelope:
+            return gpg_encryptor(recipient, passphrase)
+        data_key, key = await self.create_data_key(recipient, passphrase)
+        return DataKeyRing({data_key.id: key}).encryptor(data_key.id)
+
+    async def create_data_key(self, recipient: str, passphrase: str) -> tuple[DataKey, bytes]:
+        """New AES-256 data key, stored wrapped by the GPG recipient. Returns the row and the raw key."""
+        key = generate_data_key()
+        wrapped_key = encrypt(key.hex(), passphrase=passphrase, recipient=recipient)
+        data_key = await self.add_record(DataKey(wrapped_key=wrapped_key))
+        return data_key, key
+
+    async def load_data_keys(self, passphrase: str, ids: list[int] = None) -> DataKeyRing:
+        """Unwraps data keys (all by default) once, for opening any number of envelope secrets."""
+        my_logger.info('Loading data keys')
+        query = select(DataKey.id, DataKey.wrapped_key)
+        if ids:
+            query = query.where(DataKey.id.in_(ids))
+        result = await self.execute_query(query)
+        keys = {}
+        for id_, wrapped_key in result.all():
+            key = decrypt(wrapped_key, passphrase, strict=True)
+            if not key:
+                raise DecryptionError(f'Data key {id_} unwrapped to an empty key')
+            keys[id_] = bytes.fromhex(key)
+        return DataKeyRing(keys)
+
+    async def reencrypt_secrets(self, recipient: str, passphrase: str, chunk_size: int = 200) -> int:
+        """
+        Migrates armored PGP profile secrets to the envelope format in chunks of `chunk_size` profiles,
+        each chunk under a new data key. Already migrated secrets are left as they are.
+        Returns the number of updated profiles. A secret gpg fails to decrypt, or that decrypts to nothing,
+        raises DecryptionError before its chunk's data key or secrets are written, so the PGP copy is never
+        overwritten. The data key and the chunk's secrets are written in one transaction.
+        """
+        secret_columns = [getattr(Profile, CHAINS[chain].secret_column) for chain in CHAINS]
+        pgp_filter = or_(*[and_(column.isnot(None), ~column.startswith(ENVELOPE_PREFIX)) for column in secret_columns])
+        updated = 0
+        last_id = 0
+        while True:
+            query = (
+                select(Profile.id, *secret_columns)
+                .where(Profile.id > last_id, pgp_filter)
+                .order_by(Profile.id)
+                .limit(chunk_size)
+            )
+            rows = (await self.execute_query(query)).all()
+            if not rows:
+                return updated
+            my_logger.info('Re-encrypting secrets of {} profiles', len(rows))
+            values = []
+            plaintexts = []
+            for id_, *secrets in rows:
+                row = {'id': id_}
+                decrypted = {}
+                for column, secret in zip(secret_columns, secrets):
+                    if secret and not is_envelope(secret):
+                        decrypted[column.key] = decrypt(secret, passphrase, strict=True)
+                        if not decrypted[column.key]:
+                            raise DecryptionError(f'{column.key} of profile {id_} decrypted to an empty string')
+                    else:
+                        row[column.key] = secret
+                values.append(row)
+                plaintexts.append(decrypted)
+            key = generate_data_key()
+            wrapped_key = encrypt(key.hex(), passphrase=passphrase, recipient=recipient)
+
+            async def write(session):
+                data_key = DataKey(wrapped_key=wrapped_key)
+                session.add(data_key)
+                await session.flush()
+                encrypt_secret = DataKeyRing({data_key.id: key}).encryptor(data_key.id)
+                for row, decrypted in zip(values, plaintexts):
+                    row.update({column: encrypt_secret(plaintext) for column, plaintext in decrypted.items()})
+                await session.execute(update(Profile), values)
+
+            await self.run_write(write)
+            updated += len(values)
+            last_id = rows[-1][0]
+
+    async def _next_derivation_index(self) -> int:
+        max_index = (await self.execute_query(select(func.max(Profile.derivation_index)))).scalar()
+        return 0 if max_index is None else max_index + 1
+
+    async def fill_missing_chains(
+            self,
+            recipient: str,
+            passphrase: str,
+            chains: list[str] = None,
+            ids: list[int] = None,
+            master_seed: str = None,
+            chunk_size: int = 500,
+            envelope: bool = False
+    ) -> int:
+        """
+        Adds wallets of `chains` (all by default) to existing profiles that lack them, in batched updates.
+        A chain is missing when any of its address columns is empty. HD-derived profiles (`derivation_index` set)
+        get the missing keys derived from `master_seed`, and are skipped with a warning without it, since random
+        keys would break their recovery from the seed. Other profiles get random keys with encrypted secrets,
+        except for chains that still hold a secret, which are skipped so the stored key is never replaced.
+        Returns the number of updated profiles.
+        """
+        chains = list(chains or CHAINS)
+        address_columns = {
+            chain: [getattr(Profile, column) for column in CHAINS[chain].address_columns] for chain in chains
+        }
+        all_address_columns = [column for columns in address_columns.values() for column in columns]
+        secret_columns = [getattr(Profile, CHAINS[chain].secret_column) for chain in chains]
+        my_logger.info('Filling {} wallets of profiles', ', '.join(chains))
+
+        def build_query(clause=None):
+            query = select(Profile.id, Profile.derivation_index, *secret_columns, *all_address_columns).where(
+                or_(*[column.is_(None) for column in all_address_columns])
+            ).order_by(Profile.id)
+            return query.where(clause) if clause is not None else query
+
+        if ids:
+            rows = await self.execute_in(build_query, Profile.id, ids, scalars=False)
+        else:
+            rows = (await self.execute_query(build_query())).all()
+        keychain = HDKeychain(decrypt(master_seed, passphrase, strict=True)) if master_seed is not None else None
+        encrypt_secret = None
+        skipped_hd = []
+        updated = 0
+        for i in range(0, len(rows), chunk_size):
+            values = []
+            for id_, derivation_index, *columns in rows[i:i + chunk_size]:
+                secrets = dict(zip(chains, columns))
+                addresses = dict(zip(all_address_columns, columns[len(chains):]))
+                missing = [
+                    chain for chain in chains if any(addresses[column] is None for column in address_columns[chain])
+                ]
+                if derivation_index is not None:
+                    if keychain is None:
+                        skipped_hd.append(id_)
+                        continue
+                    wallets = wallet_columns(keychain.derive(derivation_index, missing), chains=missing)
+                else:
+                    kept = [chain for chain in missing if secrets[chain] is not None]
+                    if kept:
+                        my_logger.warning(
+                            'Profile {} has a {} secret with missing addresses, keeping it', id_, ', '.join(kept)
+                        )
+                    missing = [chain for chain in missing if chain not in kept]
+                    if not missing:
+                        continue
+                    encrypt_secret = encrypt_secret or await self._secret_encryptor(recipient, passphrase, envelope)
+                    wallets = wallet_columns(generate_random_wallets(missing), encrypt_secret, missing)
+                values.append({'id': id_, **wallets})
+            if values:
+                await self.run_write(lambda session: session.execute(update(Profile), values))
+            updated += len(values)
+        if skipped_hd:
+            my_logger.warning(
+                'Skipped {} HD-derived profiles without a master_seed: {}', len(skipped_hd), skipped_hd[:20]
+            )
+        return updated
+
     async def get_unused_emails(self, limit: int = None) -> list[Email]:
-        my_logger.info(f'Getting unused mails')
-        subquery = (
-            select(Twitter.email_id)
-            .where(Twitter.email_id.isnot(None))
-            .union(select(Profile.email_id).where(Profile.email_id.isnot(None)))
-        )
-        query = (
-            select(Email)
-            .where(and_(~Email.id.in_(subquery), not_(Email.login.ilike('%.ru'))))
-            .order_by(Email.id)
-            .limit(limit)
-        )
+        my_logger.info('Getting unused mails')
+        query = select(Email).where(unused_emails_filter()).order_by(Email.id).limit(limit)
         result = await self.execute_query(query)
         return result.scalars().all()
 
@@ -208,12 +593,10 @@ class DBHelper(BaseDBHelper):
             model: type(Twitter) | type(Discord) | type(Github),
             limit: int = None
     ) -> list[Twitter | Discord | Github]:
-        my_logger.info(f'Getting unused {model.__tablename__}')
+        my_logger.info('Getting unused {}', model.__tablename__)
         query = (
             select(model)
-            .where(~model.id.in_(
-                select(getattr(Profile, model.__name__.lower() + '_id'))
-                .where(getattr(Profile, model.__name__.lower() + '_id').isnot(None))))
+            .where(unused_model_filter(model))
             .order_by(model.id)
             .options(selectinload(model.email))
             .limit(limit)
@@ -222,19 +605,71 @@ class DBHelper(BaseDBHelper):
         return result.scalars().all()
 
     async def get_unused_proxies(self, limit: int = None) -> list[tuple[Proxy, int]]:
-        my_logger.info(f'Getting unused proxies')
-        query = (
-            select(Proxy, case(
-                (Proxy.proxy_type == 'individual', INDIVIDUAL_PROXY_LIMIT - func.count(Profile.proxy_id)),
-                (Proxy.proxy_type == 'shared', SHARED_PROXY_LIMIT - func.count(Profile.proxy_id))
-            ).label('count_1')).outerjoin(Profile).group_by(Proxy).having(
-                (Proxy.proxy_type == 'individual' and func.count(Profile.proxy_id) < 3) or
-                (Proxy.proxy_type == 'shared' and func.count(Profile.proxy_id) < 2)
-            ).order_by(desc('count_1')).limit(limit)
-        )
-        result = await self.execute_query(query)
+        my_logger.info('Getting unused proxies')
+        result = await self.execute_query(unused_proxies_query(PROXY_LIMITS).limit(limit))
         return result.all()
 
+    async def stream_violations(
+            self, checks: tuple[str, ...] = AUDIT_CHECKS, batch_size: int = 10_000
+    ) -> AsyncIterator[list[Violation]]:
+        """
+        Yields violations of the allocation invariants in `checks`: proxies over their PROXY_LIMITS, profile
+        emails that are also a twitter's and deposits of another CEX account than the profile's. Each check
+        is a set-based query streamed from a server-side cursor, `batch_size` violations at a time.
+        """
+        for check, query, to_violation in audit_queries(checks, PROXY_LIMITS):
+            my_logger.info('Auditing {}', check)
+            async with self.session_factory() as session:
+                result = await session.stream(query.execution_options(yield_per=batch_size))
+                async for partition in result.partitions(batch_size):
+                    yield [to_violation(row) for row in partition]
+
+    async def audit_integrity(self, checks: tuple[str, ...] = AUDIT_CHECKS, repair: bool = False) -> AuditReport:
+        """
+        Counts violations of `checks` (see stream_violations) with one aggregate query each. With `repair` every
+        check is fixed in one transaction: profiles past a proxy's limit move to free proxies of the same type,
+        reused emails are unlinked from the profile and wrongly linked deposits are unlinked. Capabilities of
+        repaired profiles are refreshed.
+        """
+        report = AuditReport()
+        start = time.perf_counter()
+        for check, query, _ in audit_queries(checks, PROXY_LIMITS):
+            result = await self.execute_query(select(func.count()).select_from(query.order_by(None).subquery()))
+            report.violations[check] = report.violations.get(check, 0) + result.scalar()
+        if repair:
+            repairs = {
+                'proxy_over_limit': lambda session: repair_proxies(session, PROXY_LIMITS),
+                'email_reused': repair_emails,
+                'deposit_wrong_account': repair_deposits,
+            }
+            repaired_ids = set()
+            for check, violations in report.violations.items():
+                if violations:
+                    ids = await self.run_write(repairs[check])
+                    report.repaired[check] = len(ids)
+                    repaired_ids.update(ids)
+            # Each chunk of a targeted refresh re-reads the linked tables, so past one chunk a single
+            # pass over all profiles is cheaper.
+            if repaired_ids:
+                await self.refresh_capabilities(sorted(repaired_ids) if len(repaired_ids) <= IN_CHUNK_SIZE else None)
+        report.elapsed = time.perf_counter() - start
+        my_logger.info('Audit: {}', report)
+        return report
+
+    async def get_inventory(self, cache_ttl: float = 0) -> Inventory:
+        """
+        Counts of unused emails, twitters, discords and githubs, free proxy slots per proxy_type, profiles with
+        a ready account per model and profiles missing each linked account, in one aggregate round trip.
+        With `cache_ttl` a result younger than that many seconds is returned without querying.
+        """
+        if cache_ttl and self._inventory is not None and time.monotonic() - self._inventory[0] < cache_ttl:
+            return self._inventory[1]
+        my_logger.info('Getting inventory')
+        result = await self.execute_query(inventory_query(PROXY_LIMITS))
+        inventory = to_inventory(result.one(), PROXY_LIMITS)
+        self._inventory = (time.monotonic(), inventory)
+        return inventory
+
     async def change_profile_model(
             self,
             profile_ids: int | list[int],
@@ -244,7 +679,7 @@ class DBHelper(BaseDBHelper):
     ) -> ModelType | None:
         if isinstance(profile_ids, int):
             profile_ids = [profile_ids]
-        my_logger.info(f'Changing {model.__name__.lower()} for {profile_ids} profiles')
+        my_logger.info('Changing {} for {} profiles', model.__name__.lower(), len(profile_ids))
         profiles: list[Profile] = await self.get_rows_by_id(profile_ids, Profile)
         models_to_delete: list[model] = [getattr(profile, model.__name__.lower()) for profile in profiles]
         unused_models_rows = []
@@ -255,18 +690,21 @@ class DBHelper(BaseDBHelper):
         elif model == Email:
             unused_models_rows = await self.get_unused_emails(limit=len(profile_ids))
         for profile, model in zip(profiles, unused_models_rows):
-            my_logger.info(
-                f'{profile.id} | Old {type(model).__name__.lower()} {getattr(profile, type(model).__name__.lower())}')
-            setattr(profile, type(model).__name__.lower(), model)
-            my_logger.info(
-                f'{profile.id} | New {type(model).__name__.lower()} {getattr(profile, type(model).__name__.lower())}')
+            attribute = type(model).__name__.lower()
+            old_row = getattr(profile, attribute)
+            setattr(profile, attribute, model)
+            my_logger.sampled(
+                'INFO', '{} | {} {} -> {}', profile.id, attribute, getattr(old_row, 'id', None), model.id
+            )
         edited_profile = await self.edit(profiles)
         if delete_model:
-            my_logger.info(f"{model.__tablename__.capitalize()} {models_to_delete} will be deleted")
+            my_logger.info(
+                '{} {} will be deleted', model.__tablename__.capitalize(), [el.id for el in models_to_delete]
+            )
             emails_to_delete = [getattr(model, 'email') for model in models_to_delete]
             await self.delete(models_to_delete)
             if delete_models_email:
-                my_logger.info(f'Emails {emails_to_delete} will be deleted')
+                my_logger.info('Emails {} will be deleted', [el.id for el in emails_to_delete])
                 await self.delete(emails_to_delete)
         return edited_profile
 
@@ -275,13 +713,19 @@ class DBHelper(BaseDBHelper):
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_profiles_with_shared_proxies(self):
-        query = select(Profile).join(Profile.proxy).where(Proxy.proxy_type == 'shared').options(selectinload('*'))
+    async def get_profiles_with_shared_proxies(self, with_secrets: bool = False, group: str = None):
+        query = (
+            join_group(select(Profile).join(Profile.proxy), group).where(Proxy.proxy_type == 'shared')
+            .options(*self.load_options(with_secrets))
+        )
         result = await self.execute_query(query)
         return result.scalars().all()
 
-    async def get_profiles_with_individual_proxies(self):
-        query = select(Profile).join(Profile.proxy).where(Proxy.proxy_type == 'individual').options(selectinload('*'))
+    async def get_profiles_with_individual_proxies(self, with_secrets: bool = False, group: str = None):
+        query = (
+            join_group(select(Profile).join(Profile.proxy), group).where(Proxy.proxy_type == 'individual')
+            .options(*self.load_options(with_secrets))
+        )
         result = await self.execute_query(query)
         return result.scalars().all()
 
@@ -293,10 +737,219 @@ class DBHelper(BaseDBHelper):
         union_query = union(*subqueries).subquery()
         query = select(Email).where(~Email.id.in_(select(union_query)))
         if not_ru:
-            query = query.where(~Email.login.ilike('%.ru'))
+            query = query.where(not_ru_login(Email.login))
         result = await self.execute_query(query)
         return result.scalars().all()
 
+    async def resolve_addresses(self, addresses: list[str]) -> dict[str, tuple[int, str]]:
+        """
+        Maps on-chain addresses of any supported chain to (profile_id, source column), looking them up
+        in the profile address columns first and the linked CEX deposit columns second.
+        """
+        my_logger.info('Resolving {} addresses', len(addresses))
+        keys_by_kind: dict[str, dict[str, list[str]]] = {}
+        for address in addresses:
+            kind, key = normalize_address(address)
+            if kind is not None:
+                keys_by_kind.setdefault(kind, {}).setdefault(key, []).append(address)
+        resolved = {}
+        for kind, keys in keys_by_kind.items():
+            for source, query, column in address_sources(kind):
+                unresolved = {
+                    stored: key for key, originals in keys.items() if originals[0] not in resolved
+                    for stored in stored_forms(kind, key)
+                }
+                if not unresolved:
+                    break
+                rows = await self.execute_in(
+                    lambda clause: query.where(clause), column, list(unresolved), scalars=False
+                )
+                for stored, profile_id in rows:
+                    for address in keys[unresolved[stored]]:
+                        resolved.setdefault(address, (profile_id, source))
+        return resolved
+
+    async def load_address_index(self) -> AddressIndex:
+        my_logger.info('Loading address index')
+        index = AddressIndex()
+        for kind in (EVM, APTOS, SOLANA, BTC):
+            for source, query, column in address_sources(kind):
+                result = await self.execute_query(query.where(column.isnot(None)))
+                for address, profile_id in result.all():
+                    index.add(address, profile_id, source)
+        return index
+
+    async def ingest_deposits(
+            self,
+            cex_model: type(Binance) | type(ByBit) | type(Okx) | type(Mexc) | type(Bitget),
+            account_id: int,
+            rows: list[dict],
+            chunk_size: int = 1000,
+            link: bool = True
+    ) -> DepositIngestReport:
+        """
+        Bulk upserts deposit addresses (dicts with evm/aptos/solana keys) of one CEX account,
+        then links unlinked deposits of that account to profiles with link_deposits.
+        A row matching a stored deposit of the account fills that deposit's empty columns.
+        Rows with an address stored for another account, matching several stored deposits or contradicting a
+        stored address are reported as conflicts and skipped; rows repeating an address of the batch are counted
+        as duplicates.
+        """
+        deposit_model, _ = CEX_DEPOSITS[cex_model]
+        account_column = getattr(deposit_model, f'{cex_model.__name__.lower()}_id')
+        deposit_columns = [getattr(deposit_model, column_name) for column_name in DEPOSIT_COLUMNS]
+        my_logger.info('Ingesting {} {} for account {}', len(rows), deposit_model.__tablename__, account_id)
+        start = time.perf_counter()
+        report = DepositIngestReport(rows=len(rows))
+        valid, report.invalid, report.duplicates = split_deposit_rows(rows)
+        stored = {}
+        owners = {}
+        for column_name, column in zip(DEPOSIT_COLUMNS, deposit_columns):
+            addresses = [row[column_name] for row in valid if row[column_name] is not None]
+            found = await self.execute_in(
+                lambda clause: select(deposit_model.id, account_column, *deposit_columns).where(clause),
+                column, addresses, scalars=False
+            )
+            for id_, owner, *values in found:
+                stored[id_] = (owner, dict(zip(DEPOSIT_COLUMNS, values)))
+                owners[(column_name, stored[id_][1][column_name])] = id_
+        new_rows, filled_rows = [], []
+        for row in valid:
+            ids = {owners.get((column, row[column])) for column in DEPOSIT_COLUMNS if row[column] is not None}
+            ids.discard(None)
+            if not ids:
+                new_rows.append({**row, account_column.key: account_id})
+                continue
+            id_ = ids.pop()
+            owner, values = stored[id_]
+            if ids or owner != account_id or any(
+                    row[column] is not None and values[column] not in (None, row[column]) for column in DEPOSIT_COLUMNS
+            ):
+                report.conflicts.append(row)
+                continue
+            fill = {
+                column: row[column] for column in DEPOSIT_COLUMNS if row[column] is not None and values[column] is None
+            }
+            if fill:
+                filled_rows.append({'id': id_, **fill})
+            else:
+                report.existing += 1
+        count_query = select(func.count(deposit_model.id)).where(account_column == account_id)
+        before = (await self.execute_query(count_query)).scalar()
+
+        async def upsert_rows(session):
+            for i in range(0, len(new_rows), chunk_size):
+                await session.execute(self.insert_ignore(deposit_model), new_rows[i:i + chunk_size])
+            for i in range(0, len(filled_rows), chunk_size):
+                await session.execute(update(deposit_model), filled_rows[i:i + chunk_size])
+
+        await self.run_write(upsert_rows)
+        report.inserted = (await self.execute_query(count_query)).scalar() - before
+        report.updated = len(filled_rows)
+        if link:
+            report.linked = await self.link_deposits(cex_model, account_id)
+        report.elapsed = time.perf_counter() - start
+        my_logger.info('{} ingestion: {}', deposit_model.__tablename__, report)
+        return report
+
+    async def link_deposits(
+            self,
+            cex_model: type(Binance) | type(ByBit) | type(Okx) | type(Mexc) | type(Bitget),
+            account_id: int,
+            profile_ids: list[int] = None
+    ) -> int:
+        """
+        Assigns unlinked deposits of a CEX account to profiles of that account without a deposit of that CEX
+        (optionally only `profile_ids`) in one UPDATE ... FROM statement. Returns the number of linked profiles.
+        """
+        deposit_model, profile_column = CEX_DEPOSITS[cex_model]
+        account_column = getattr(deposit_model, f'{cex_model.__name__.lower()}_id')
+        my_logger.info('Linking {} of account {} to profiles', deposit_model.__tablename__, account_id)
+        free_deposits = (
+            select(deposit_model.id, func.row_number().over(order_by=deposit_model.id).label('rn'))
+            .where(account_column == account_id)
+            .where(~deposit_model.id.in_(select(profile_column).where(profile_column.isnot(None))))
+            .subquery()
+        )
+        profiles_query = select(Profile.id, func.row_number().over(order_by=Profile.id).label('rn')).where(
+            getattr(Profile, f'{cex_model.__name__.lower()}_id') == account_id, profile_column.is_(None)
+        )
+        if profile_ids:
+            profiles_query = profiles_query.where(Profile.id.in_(profile_ids))
+        free_profiles = profiles_query.subquery()
+        pairs = (
+            select(free_profiles.c.id.label('profile_id'), free_deposits.c.id.label('deposit_id'))
+            .join(free_deposits, free_deposits.c.rn == free_profiles.c.rn)
+            .subquery()
+        )
+        query = (
+            update(Profile)
+            .where(Profile.id == pairs.c.profile_id)
+            .values({profile_column.key: pairs.c.deposit_id})
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.execute_query(query)
+        return result.rowcount
+
+    async def archive_profiles(self, ids: list[int], chunk_size: int = IN_CHUNK_SIZE) -> ArchiveReport:
+        """
+        Moves retired profiles with their email, socials, CEX accounts and deposits into archived_* tables,
+        one set-based transaction per `chunk_size` profiles. Rows still referenced by hot rows stay hot.
+        """
+        return await self._move_archive(ids, chunk_size, collect_hot, move_to_archive)
+
+    async def restore_profiles(self, ids: list[int], chunk_size: int = IN_CHUNK_SIZE) -> ArchiveReport:
+        """Moves archived profiles and the rows archived with them back into the hot tables."""
+        return await self._move_archive(ids, chunk_size, collect_archived, move_from_archive)
+
+    async def archive_accounts(self, model: ModelType, ids: list[int]) -> ArchiveReport:
+        """Archives loose accounts (or emails) of `model` that no profile, account or deposit references."""
+
+        async def archive(session):
+            moved = await collect_unreferenced(session, model, ids)
+            await move_to_archive(session, moved)
+            return moved
+
+        return await self._run_archive([archive])
+
+    async def restore_accounts(self, model: ModelType, ids: list[int]) -> ArchiveReport:
+        """Moves archived loose accounts (or emails) of `model` back into the hot table."""
+
+        async def restore(session):
+            moved = await collect_archived_accounts(session, model, ids)
+            await move_from_archive(session, moved)
+            return moved
+
+        return await self._run_archive([restore])
+
+    async def _move_archive(self, ids: list[int], chunk_size: int, collect, move) -> ArchiveReport:
+        def move_chunk(chunk):
+            async def operation(session):
+                moved = await collect(session, chunk)
+                await move(session, moved)
+                return moved
+            return operation
+
+        return await self._run_archive([move_chunk(ids[i:i + chunk_size]) for i in range(0, len(ids), chunk_size)])
+
+    async def _run_archive(self, operations: list) -> ArchiveReport:
+        report = ArchiveReport()
+        start = time.perf_counter()
+        for operation in operations:
+            report.add(await self.run_write(operation))
+        report.elapsed = time.perf_counter() - start
+        my_logger.info('Archive: {}', report)
+        return report
+
+    async def get_archived_rows(self, model: ModelType, ids: list[int] = None, limit: int = None) -> list[RowMapping]:
+        """Rows of `model` in its archive table (with archived_at), by `ids` or most recently archived first."""
+        table = ARCHIVE_TABLES[model]
+        if ids:
+            rows = await self.execute_in(lambda clause: select(table).where(clause), table.c.id, ids, scalars=False)
+            return sorted((row._mapping for row in rows), key=lambda row: row['id'])[:limit]
+        query = select(table).order_by(table.c.archived_at.desc(), table.c.id).limit(limit)
+        return list((await self.execute_query(query)).mappings().all())
+
 
 def create_db_instance(
         connection_string: str = None, engine_echo: bool = False, query_echo: bool = False
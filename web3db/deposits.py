@@ -0,0 +1,74 @@
+import csv
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from web3db.models import (
+    Profile, Binance, ByBit, Okx, Mexc, Bitget, BinanceDeposit, ByBitDeposit, OkxDeposit, MexcDeposit, BitgetDeposit
+)
+
+DEPOSIT_COLUMNS = ('evm', 'aptos', 'solana')
+CEX_DEPOSITS = {
+    Binance: (BinanceDeposit, Profile.binance_deposit_id),
+    ByBit: (ByBitDeposit, Profile.bybit_deposit_id),
+    Okx: (OkxDeposit, Profile.okx_deposit_id),
+    Mexc: (MexcDeposit, Profile.mexc_deposit_id),
+    Bitget: (BitgetDeposit, Profile.bitget_deposit_id),
+}
+
+
+@dataclass
+class DepositIngestReport:
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    existing: int = 0
+    duplicates: int = 0
+    linked: int = 0
+    invalid: list[dict] = field(default_factory=list)
+    conflicts: list[dict] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.rows} rows: {self.inserted} inserted, {self.updated} updated, {self.existing} existing, '
+            f'{self.duplicates} duplicates, {self.linked} linked, {len(self.invalid)} invalid, '
+            f'{len(self.conflicts)} conflicts '
+            f'in {self.elapsed:.2f}s ({self.rows_per_sec:.0f} rows/sec)'
+        )
+
+
+def read_deposit_export(path: str | Path, delimiter: str = ',') -> list[dict]:
+    """Reads a CEX deposit-address export with any of the evm, aptos, solana columns."""
+    with open(path, 'r') as csv_file:
+        reader = csv.DictReader(csv_file, delimiter=delimiter)
+        return [
+            {column: (row.get(column) or '').strip() or None for column in DEPOSIT_COLUMNS}
+            for row in reader
+        ]
+
+
+def split_deposit_rows(rows: list[dict]) -> tuple[list[dict], list[dict], int]:
+    """
+    Splits rows into (valid, invalid, duplicates) according to the check_at_least_one_not_null constraint,
+    dropping and counting as duplicates the rows that repeat an address already seen in the batch.
+    """
+    valid, invalid = [], []
+    duplicates = 0
+    seen = {column: set() for column in DEPOSIT_COLUMNS}
+    for row in rows:
+        row = {column: row.get(column) or None for column in DEPOSIT_COLUMNS}
+        if all(row[column] is None for column in DEPOSIT_COLUMNS):
+            invalid.append(row)
+            continue
+        if any(row[column] is not None and row[column] in seen[column] for column in DEPOSIT_COLUMNS):
+            duplicates += 1
+            continue
+        for column in DEPOSIT_COLUMNS:
+            if row[column] is not None:
+                seen[column].add(row[column])
+        valid.append(row)
+    return valid, invalid, duplicates
@@ -0,0 +1,148 @@
+import csv
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import Select, inspect
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from web3db.models import Profile
+from web3db.models.base import SECRETS_GROUP
+
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+DEFAULT_EXPORT_COLUMNS = (
+    'id', 'evm_address', 'aptos_address', 'solana_address', 'btc_native_segwit_address', 'btc_taproot_address',
+    'proxy.proxy_string', 'proxy.proxy_type', 'email.login', 'twitter.login', 'twitter.ready', 'discord.login',
+    'github.login',
+)
+
+
+@dataclass
+class ExportReport:
+    path: str
+    format: str
+    rows: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.rows} rows to {self.path} ({self.format}) in {self.elapsed:.2f}s '
+            f'({self.rows_per_sec:.0f} rows/sec)'
+        )
+
+
+def export_query(model, columns: tuple[str, ...] | list[str] = DEFAULT_EXPORT_COLUMNS) -> Select:
+    """
+    Column-only select of `columns` of `model`: plain names are its own columns and 'relationship.column'
+    names are columns of a related account, outer-joined once per relationship and labelled relationship_column.
+    Deferred secret columns cannot be exported.
+    """
+    mapper = inspect(model)
+    joined = {}
+    selected = []
+    for name in columns:
+        relationship_name, _, column_name = name.rpartition('.')
+        if relationship_name:
+            if relationship_name not in joined:
+                relationship = mapper.relationships[relationship_name]
+                joined[relationship_name] = aliased(relationship.mapper.class_), getattr(model, relationship_name)
+            target = joined[relationship_name][0]
+        else:
+            target = model
+        prop = inspect(target).mapper.column_attrs[column_name]
+        if prop.deferred and prop.group == SECRETS_GROUP:
+            raise ValueError(f'{name} is a secret column')
+        selected.append(getattr(target, column_name).label(name.replace('.', '_')))
+    query = select(*selected).select_from(model)
+    for target, relationship in joined.values():
+        query = query.outerjoin(target, relationship.of_type(target))
+    return query.order_by(model.id)
+
+
+class CsvSink:
+    def __init__(self, path: Path, names: list[str]):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(names)
+
+    def write(self, rows: list):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowSink:
+    """Writes each partition as one Arrow record batch to a Parquet or Arrow IPC file; needs pyarrow."""
+
+    def __init__(self, path: Path, names: list[str], python_types: list[type], parquet: bool):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError('Parquet and Arrow exports need pyarrow: pip install "web3db[export]"') from None
+        arrow_types = {int: pa.int64(), bool: pa.bool_(), float: pa.float64(), datetime: pa.timestamp('us')}
+        self.pa = pa
+        self.schema = pa.schema([
+            (name, arrow_types.get(python_type, pa.string())) for name, python_type in zip(names, python_types)
+        ])
+        if parquet:
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, rows: list):
+        columns = list(zip(*rows))
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+def _python_type(column) -> type:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return str
+
+
+async def stream_export(
+        db,
+        path: str | Path,
+        model=Profile,
+        columns: tuple[str, ...] | list[str] = DEFAULT_EXPORT_COLUMNS,
+        format: str = None,
+        batch_size: int = 10_000
+) -> ExportReport:
+    """Streams export_query rows from a server-side cursor into a file, one `batch_size` partition at a time."""
+    path = Path(path)
+    format = format or path.suffix.lstrip('.').replace('feather', 'arrow')
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format {format!r}, expected one of {EXPORT_FORMATS}')
+    query = export_query(model, columns)
+    names = [column.name for column in query.selected_columns]
+    if format == 'csv':
+        sink = CsvSink(path, names)
+    else:
+        sink = ArrowSink(path, names, [_python_type(column) for column in query.selected_columns], format == 'parquet')
+    report = ExportReport(str(path), format)
+    start = time.perf_counter()
+    try:
+        async with db.session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            async for partition in result.partitions(batch_size):
+                sink.write(partition)
+                report.rows += len(partition)
+    finally:
+        sink.close()
+    report.elapsed = time.perf_counter() - start
+    return report
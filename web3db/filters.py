@@ -0,0 +1,220 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import IntFlag
+from functools import reduce
+
+from sqlalchemy import ColumnElement, Select, and_, case, inspect, literal, not_, or_, true
+from sqlalchemy.future import select
+from sqlalchemy.orm import RelationshipDirection, aliased
+
+from web3db.groups import members_query
+from web3db.models import Profile, Proxy
+
+
+class Capability(IntFlag):
+    """Bits of Profile.capabilities. Values are stored, so existing bits must never be renumbered."""
+    EMAIL = 1 << 0
+    TWITTER = 1 << 1
+    TWITTER_READY = 1 << 2
+    DISCORD = 1 << 3
+    GITHUB = 1 << 4
+    BINANCE = 1 << 5
+    BYBIT = 1 << 6
+    OKX = 1 << 7
+    MEXC = 1 << 8
+    BITGET = 1 << 9
+    BINANCE_DEPOSIT = 1 << 10
+    BYBIT_DEPOSIT = 1 << 11
+    OKX_DEPOSIT = 1 << 12
+    MEXC_DEPOSIT = 1 << 13
+    BITGET_DEPOSIT = 1 << 14
+    INDIVIDUAL_PROXY = 1 << 15
+    SHARED_PROXY = 1 << 16
+
+
+class ProfileFilter(ABC):
+    """
+    Predicate over profiles, combined with &, | and ~ and compiled into a single WHERE clause on Profile.
+    Linked rows are tested with IN subqueries on the foreign keys, so any combination stays one query.
+    """
+
+    def __and__(self, other: 'ProfileFilter') -> 'ProfileFilter':
+        return All(_flatten(All, self, other))
+
+    def __or__(self, other: 'ProfileFilter') -> 'ProfileFilter':
+        return AnyOf(_flatten(AnyOf, self, other))
+
+    def __invert__(self) -> 'ProfileFilter':
+        return Not(self)
+
+    @abstractmethod
+    def compile(self, use_capabilities: bool = False) -> ColumnElement[bool]:
+        """
+        WHERE clause for this filter. With `use_capabilities` predicates that have a Capability bit are
+        tested against Profile.capabilities instead, the ones under each AND folded into one mask test,
+        which is only as fresh as the last DBHelper.refresh_capabilities.
+        """
+
+
+@dataclass(frozen=True, eq=False)
+class Predicate(ProfileFilter):
+    name: str
+    clause: ColumnElement[bool]
+    capability: Capability | None = None
+
+    def compile(self, use_capabilities: bool = False) -> ColumnElement[bool]:
+        if use_capabilities and self.capability is not None:
+            return _mask_test(self.capability)
+        return self.clause
+
+    def __repr__(self):
+        return self.name
+
+
+@dataclass(frozen=True, eq=False)
+class All(ProfileFilter):
+    filters: tuple[ProfileFilter, ...]
+
+    def compile(self, use_capabilities: bool = False) -> ColumnElement[bool]:
+        clauses = []
+        mask = Capability(0)
+        for profile_filter in self.filters:
+            if use_capabilities and isinstance(profile_filter, Predicate) and profile_filter.capability is not None:
+                mask |= profile_filter.capability
+            else:
+                clauses.append(profile_filter.compile(use_capabilities))
+        if mask:
+            clauses.insert(0, _mask_test(mask))
+        return and_(*clauses) if clauses else true()
+
+    def __repr__(self):
+        return '(' + ' & '.join(map(repr, self.filters)) + ')'
+
+
+@dataclass(frozen=True, eq=False)
+class AnyOf(ProfileFilter):
+    filters: tuple[ProfileFilter, ...]
+
+    def compile(self, use_capabilities: bool = False) -> ColumnElement[bool]:
+        return or_(*[profile_filter.compile(use_capabilities) for profile_filter in self.filters])
+
+    def __repr__(self):
+        return '(' + ' | '.join(map(repr, self.filters)) + ')'
+
+
+@dataclass(frozen=True, eq=False)
+class Not(ProfileFilter):
+    filter: ProfileFilter
+
+    def compile(self, use_capabilities: bool = False) -> ColumnElement[bool]:
+        return not_(self.filter.compile(use_capabilities))
+
+    def __repr__(self):
+        return f'~{self.filter!r}'
+
+
+def _flatten(kind: type, *filters: ProfileFilter) -> tuple[ProfileFilter, ...]:
+    flat = []
+    for profile_filter in filters:
+        flat += profile_filter.filters if isinstance(profile_filter, kind) else [profile_filter]
+    return tuple(flat)
+
+
+def _mask_test(mask: Capability) -> ColumnElement[bool]:
+    return Profile.capabilities.op('&')(int(mask)) == int(mask)
+
+
+def _link(model: type) -> tuple[str, ColumnElement]:
+    """Relationship name and foreign key column of the row of `model` a profile links to."""
+    for relationship in inspect(Profile).relationships:
+        if relationship.mapper.class_ is model and relationship.direction is RelationshipDirection.MANYTOONE:
+            return relationship.key, next(iter(relationship.local_columns))
+    raise ValueError(f'Profiles do not link to {model.__name__}')
+
+
+def _linked_in(column: ColumnElement, linked, *conditions: ColumnElement[bool]) -> ColumnElement[bool]:
+    """
+    `column` IN the ids of matching linked rows: an uncorrelated subquery that SQLite and PostgreSQL run once off
+    the partial and proxy_type indexes, then seek profiles by the foreign key. The IS NOT NULL keeps it two-valued
+    under ~.
+    """
+    return column.isnot(None) & column.in_(select(linked.id).where(*conditions))
+
+
+def _capability(name: str) -> Capability | None:
+    return Capability.__members__.get(name.upper())
+
+
+def has(model: type) -> Predicate:
+    """Profiles linked to a row of `model`: an account, a CEX deposit, an email or a proxy."""
+    key, column = _link(model)
+    return Predicate(f'has({model.__name__})', column.isnot(None), _capability(key))
+
+
+def ready(model: type) -> Predicate:
+    """Profiles whose linked account of `model` is ready."""
+    key, column = _link(model)
+    linked = aliased(model)
+    return Predicate(
+        f'ready({model.__name__})', _linked_in(column, linked, linked.ready),
+        _capability(f'{key}_ready')
+    )
+
+
+def with_totp(model: type) -> Predicate:
+    """Profiles whose linked account of `model` has a TOTP secret."""
+    _, column = _link(model)
+    linked = aliased(model)
+    return Predicate(
+        f'with_totp({model.__name__})', _linked_in(column, linked, linked.totp_secret.isnot(None))
+    )
+
+
+def proxy_type(type_: str) -> Predicate:
+    """Profiles using a proxy of `type_`: 'individual' or 'shared'."""
+    linked = aliased(Proxy)
+    return Predicate(
+        f'proxy_type({type_!r})',
+        _linked_in(Profile.proxy_id, linked, linked.proxy_type == type_),
+        _capability(f'{type_}_proxy')
+    )
+
+
+def in_group(group: str) -> Predicate:
+    """Profiles in the group called `group`, tested against its membership index."""
+    return Predicate(f'in_group({group!r})', Profile.id.in_(members_query(group).order_by(None)))
+
+
+def where(clause: ColumnElement[bool], name: str = None) -> Predicate:
+    """Any other SQL condition on Profile."""
+    return Predicate(name or str(clause), clause)
+
+
+def capability_predicates() -> list[Predicate]:
+    """One predicate per Capability bit, computed from the linked rows."""
+    predicates = []
+    for relationship in inspect(Profile).relationships:
+        if relationship.direction is not RelationshipDirection.MANYTOONE:
+            continue
+        model = relationship.mapper.class_
+        if model is Proxy:
+            predicates += [proxy_type('individual'), proxy_type('shared')]
+            continue
+        predicates.append(has(model))
+        if hasattr(model, 'ready'):
+            predicates.append(ready(model))
+    return [predicate for predicate in predicates if predicate.capability is not None]
+
+
+def capabilities_value() -> ColumnElement[int]:
+    """SQL expression of a profile's Capability bits, for UPDATE profiles SET capabilities = ..."""
+    return reduce(
+        lambda total, predicate: total + case((predicate.clause, int(predicate.capability)), else_=0),
+        capability_predicates(), literal(0)
+    )
+
+
+def filter_query(profile_filter: ProfileFilter, query: Select = None, use_capabilities: bool = False) -> Select:
+    """`query` (select(Profile) by default) narrowed to the profiles matching `profile_filter`, in id order."""
+    query = select(Profile) if query is None else query
+    return query.where(profile_filter.compile(use_capabilities)).order_by(Profile.id)
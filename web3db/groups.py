@@ -0,0 +1,32 @@
+from sqlalchemy import ColumnElement, Select, and_
+from sqlalchemy.future import select
+
+from web3db.models import Profile, ProfileGroup, ProfileGroupMember
+
+
+def group_id(name: str) -> ColumnElement[int]:
+    """Scalar subquery of the id of the group called `name`, looked up once through its unique name index."""
+    return select(ProfileGroup.id).where(ProfileGroup.name == name).scalar_subquery()
+
+
+def join_group(query: Select, group: str | None, profile_id: ColumnElement[int] = Profile.id) -> Select:
+    """
+    `query` narrowed to members of `group` by an inner join on the membership primary key, so a group of any
+    size costs one index range instead of an IN list of its ids. `profile_id` is the joined id column when the
+    query selects profiles through a subquery. No group leaves the query unchanged.
+    """
+    if group is None:
+        return query
+    return query.join(
+        ProfileGroupMember,
+        and_(ProfileGroupMember.group_id == group_id(group), ProfileGroupMember.profile_id == profile_id)
+    )
+
+
+def members_query(group: str) -> Select:
+    """Profile ids of `group` in id order, read from the membership index alone."""
+    return (
+        select(ProfileGroupMember.profile_id)
+        .where(ProfileGroupMember.group_id == group_id(group))
+        .order_by(ProfileGroupMember.profile_id)
+    )
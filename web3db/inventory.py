@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+
+from sqlalchemy import ColumnElement, Select, and_, case, desc, func, or_
+from sqlalchemy.future import select
+
+from web3db.models import Profile, Proxy, Email, Twitter, Discord, Github, Binance, ByBit, Okx, Mexc, Bitget
+from web3db.models.email import not_ru_login
+
+UNUSED_MODELS = (Twitter, Discord, Github)
+LINKED_MODELS = (Proxy, Email, Twitter, Discord, Github, Binance, ByBit, Okx, Mexc, Bitget)
+READY_MODELS = tuple(model for model in LINKED_MODELS if hasattr(model, 'ready'))
+
+
+@dataclass
+class Inventory:
+    """Counts of resources available for new profiles and of gaps in existing ones, keyed by table name."""
+    profiles: int = 0
+    unused: dict[str, int] = field(default_factory=dict)
+    free_proxy_slots: dict[str, int] = field(default_factory=dict)
+    ready: dict[str, int] = field(default_factory=dict)
+    missing: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def potential_profiles(self) -> int:
+        """Profiles create_profiles could add now: one per free proxy slot."""
+        return sum(self.free_proxy_slots.values())
+
+    def __str__(self):
+        def counts(values: dict[str, int]) -> str:
+            return ', '.join(f'{count} {name}' for name, count in values.items()) or 'none'
+
+        return (
+            f'{self.profiles} profiles, unused: {counts(self.unused)}, '
+            f'free proxy slots: {counts(self.free_proxy_slots)}, ready: {counts(self.ready)}, '
+            f'missing: {counts(self.missing)}'
+        )
+
+
+def _fk(model: type):
+    return getattr(Profile, f'{model.__name__.lower()}_id')
+
+
+def unused_emails_filter() -> ColumnElement[bool]:
+    """Emails not linked to a profile or a twitter, .ru excluded."""
+    used = (
+        select(Twitter.email_id)
+        .where(Twitter.email_id.isnot(None))
+        .union(select(Profile.email_id).where(Profile.email_id.isnot(None)))
+    )
+    return ~Email.id.in_(used) & not_ru_login(Email.login)
+
+
+def unused_model_filter(model: type[Twitter] | type[Discord] | type[Github]) -> ColumnElement[bool]:
+    """Accounts of `model` not linked to a profile."""
+    return ~model.id.in_(select(_fk(model)).where(_fk(model).isnot(None)))
+
+
+def unused_proxies_query(proxy_limits: dict[str, int]) -> Select:
+    """Proxies below their limit in `proxy_limits` with the count of profiles each can still take, most free first."""
+    used = func.count(Profile.proxy_id)
+    return (
+        select(Proxy, case(*[
+            (Proxy.proxy_type == proxy_type, limit - used) for proxy_type, limit in proxy_limits.items()
+        ]).label('count_1'))
+        .outerjoin(Profile)
+        .group_by(Proxy)
+        .having(or_(*[
+            and_(Proxy.proxy_type == proxy_type, used < limit) for proxy_type, limit in proxy_limits.items()
+        ]))
+        .order_by(desc('count_1'), Proxy.id)
+    )
+
+
+def inventory_query(proxy_limits: dict[str, int]) -> Select:
+    """
+    One aggregate SELECT with a column per count: a single pass over profiles for the totals and missing links,
+    plus one scalar subquery per unused model, proxy type and ready model. `proxy_limits` maps
+    proxy_type to the number of profiles a proxy of that type can serve.
+    """
+    profile_counts = select(
+        func.count().label('profiles'),
+        *[func.count(_fk(model)).label(f'linked_{model.__tablename__}') for model in LINKED_MODELS]
+    ).subquery()
+    used = (
+        select(Proxy.proxy_type, func.count(Profile.id).label('used'))
+        .outerjoin(Profile, Profile.proxy_id == Proxy.id)
+        .group_by(Proxy.id, Proxy.proxy_type)
+        .subquery()
+    )
+    columns = [
+        select(func.count()).select_from(Email).where(unused_emails_filter()).scalar_subquery().label('unused_emails'),
+        *[
+            select(func.count()).select_from(model).where(unused_model_filter(model)).scalar_subquery()
+            .label(f'unused_{model.__tablename__}')
+            for model in UNUSED_MODELS
+        ],
+        *[
+            select(func.coalesce(func.sum(case((used.c.used < limit, limit - used.c.used), else_=0)), 0))
+            .where(used.c.proxy_type == proxy_type).scalar_subquery().label(f'free_{proxy_type}')
+            for proxy_type, limit in proxy_limits.items()
+        ],
+        *[
+            select(func.count()).select_from(Profile).join(model).where(model.ready).scalar_subquery()
+            .label(f'ready_{model.__tablename__}')
+            for model in READY_MODELS
+        ],
+    ]
+    return select(*profile_counts.c, *columns)
+
+
+def to_inventory(row, proxy_limits: dict[str, int]) -> Inventory:
+    values = row._mapping
+    profiles = values['profiles']
+    return Inventory(
+        profiles=profiles,
+        unused={
+            Email.__tablename__: values['unused_emails'],
+            **{model.__tablename__: values[f'unused_{model.__tablename__}'] for model in UNUSED_MODELS}
+        },
+        free_proxy_slots={proxy_type: values[f'free_{proxy_type}'] for proxy_type in proxy_limits},
+        ready={model.__tablename__: values[f'ready_{model.__tablename__}'] for model in READY_MODELS},
+        missing={
+            model.__tablename__: profiles - values[f'linked_{model.__tablename__}'] for model in LINKED_MODELS
+        },
+    )
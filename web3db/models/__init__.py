@@ -11,3 +11,7 @@ from .bybit import ByBit
 from .mexc import Mexc
 from .bitget import Bitget
 from .deposit import BinanceDeposit, ByBitDeposit, OkxDeposit, MexcDeposit, BitgetDeposit
+from .data_key import DataKey
+from .tombstone import Tombstone
+from .group import ProfileGroup, ProfileGroupMember
+from .archive import ARCHIVE_TABLES, ARCHIVED_GROUP_MEMBERS
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, DateTime, Index, Table
+
+from .base import Base
+from .binance import Binance
+from .bitget import Bitget
+from .bybit import ByBit
+from .deposit import BinanceDeposit, ByBitDeposit, OkxDeposit, MexcDeposit, BitgetDeposit
+from .discord import Discord
+from .email import Email
+from .github import Github
+from .group import ProfileGroupMember
+from .mexc import Mexc
+from .okx import Okx
+from .profile import Profile
+from .twitter import Twitter
+
+ARCHIVE_PREFIX = 'archived_'
+ARCHIVED_MODELS = (
+    Profile, Email, Twitter, Discord, Github, Binance, ByBit, Okx, Mexc, Bitget,
+    BinanceDeposit, ByBitDeposit, OkxDeposit, MexcDeposit, BitgetDeposit,
+)
+
+
+def _archive_table(table: Table) -> Table:
+    """Copy of `table` without unique and foreign key constraints, plus the time each row was archived."""
+    return Table(
+        ARCHIVE_PREFIX + table.name,
+        Base.metadata,
+        *[
+            Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False,
+                   nullable=not column.primary_key)
+            for column in table.columns
+        ],
+        Column('archived_at', DateTime, nullable=False, index=True),
+    )
+
+
+ARCHIVE_TABLES: dict[type, Table] = {model: _archive_table(model.__table__) for model in ARCHIVED_MODELS}
+# Group memberships leave and come back with their profiles, looked up by profile_id.
+ARCHIVED_GROUP_MEMBERS = _archive_table(ProfileGroupMember.__table__)
+Index('ix_archived_profile_group_members_profile_id', ARCHIVED_GROUP_MEMBERS.c.profile_id)
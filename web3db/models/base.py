@@ -1,8 +1,10 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, event
+from sqlalchemy import DateTime, Index, event, true
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+SECRETS_GROUP = 'secrets'
+
 
 class Base(DeclarativeBase):
     pass
@@ -15,6 +17,36 @@ class BaseModel:
     )
 
 
+@event.listens_for(BaseModel, 'after_mapper_constructed', propagate=True)
+def _add_change_feed_index(mapper, class_):
+    """Every BaseModel table gets an (updated_at, id) index backing DBHelper.get_changes."""
+    table = mapper.local_table
+    Index(f'ix_{table.name}_updated_at_id', table.c.updated_at, table.c.id)
+
+
+# Column -> condition of its partial index. SQLite only uses a partial index when the query repeats
+# the condition term for term, so these render exactly like the getters' where clauses.
+PARTIAL_INDEXES = {
+    'ready': lambda column: column == true(),
+    'totp_secret': lambda column: column.isnot(None),
+}
+
+
+@event.listens_for(BaseModel, 'after_mapper_constructed', propagate=True)
+def _add_partial_indexes(mapper, class_):
+    """
+    Tables with a ready flag or a TOTP secret get an index over only those rows, backing the ready and
+    with-TOTP getters, filters and TotpService; the TOTP one also holds the secret so loading secrets
+    never touches the table. Dialects without partial indexes ignore the condition.
+    """
+    table = mapper.local_table
+    for name, condition in PARTIAL_INDEXES.items():
+        if name in table.c:
+            where = condition(table.c[name])
+            columns = [table.c.id] if name == 'ready' else [table.c.id, table.c[name]]
+            Index(f'ix_{table.name}_id_{name}', *columns, sqlite_where=where, postgresql_where=where)
+
+
 class SocialBaseModel(BaseModel):
     password_updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     password: Mapped[str]
@@ -0,0 +1,16 @@
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, BaseModel
+
+
+class DataKey(BaseModel, Base):
+    __tablename__ = 'data_keys'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    wrapped_key: Mapped[str]
+
+    def __repr__(self):
+        return f'{self.id}:{self.created_at}'
+
+    def __str__(self):
+        return repr(self)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, DateTime, event
+from sqlalchemy import ColumnElement, String, DateTime, Index, event, literal_column, not_
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, SocialBaseModel
@@ -18,6 +18,14 @@ if TYPE_CHECKING:
     from .bitget import Bitget
 
 
+def not_ru_login(login) -> ColumnElement[bool]:
+    """
+    Logins outside the .ru zone. The pattern is a literal rather than a bound parameter so the condition renders
+    exactly like the ix_emails_id_not_ru one, which SQLite needs to use that partial index.
+    """
+    return not_(login.ilike(literal_column("'%.ru'")))
+
+
 class Email(SocialBaseModel, Base):
     __tablename__ = "emails"
 
@@ -47,3 +55,10 @@ class Email(SocialBaseModel, Base):
 
     def __str__(self):
         return repr(self)
+
+
+# Unused-email lookups scan non-.ru emails in id order; this index holds only those ids.
+Index(
+    'ix_emails_id_not_ru', Email.id,
+    sqlite_where=not_ru_login(Email.login), postgresql_where=not_ru_login(Email.login)
+)
@@ -0,0 +1,38 @@
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, BaseModel
+
+
+class ProfileGroup(BaseModel, Base):
+    """Named, fixed set of profiles, e.g. the ones a campaign runs on."""
+    __tablename__ = 'profile_groups'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String, unique=True)
+
+    def __repr__(self):
+        return f'{self.id}:{self.name}'
+
+    def __str__(self):
+        return repr(self)
+
+
+class ProfileGroupMember(Base):
+    """
+    Membership of a profile in a group. The (group_id, profile_id) primary key is the index a group's
+    profiles are read from; the profile_id one serves archiving and removal by profile.
+    """
+    __tablename__ = 'profile_group_members'
+    __table_args__ = (
+        Index('ix_profile_group_members_profile_id', 'profile_id'),
+    )
+
+    group_id: Mapped[int] = mapped_column(ForeignKey('profile_groups.id', ondelete='CASCADE'), primary_key=True)
+    profile_id: Mapped[int] = mapped_column(ForeignKey('profiles.id', ondelete='CASCADE'), primary_key=True)
+
+    def __repr__(self):
+        return f'{self.group_id}:{self.profile_id}'
+
+    def __str__(self):
+        return repr(self)
@@ -1,9 +1,9 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from .base import Base, BaseModel
+from .base import Base, BaseModel, SECRETS_GROUP
 from .mixins import (
     EmailRelationMixin,
     TwitterRelationMixin,
@@ -42,6 +42,9 @@ class Profile(
     Base,
 ):
     __tablename__ = "profiles"
+    __table_args__ = (
+        Index("ix_profiles_proxy_id", "proxy_id"),
+    )
     _email_back_populates = "profile"
     _twitter_back_populates = "profile"
     _discord_back_populates = "profile"
@@ -54,15 +57,18 @@ class Profile(
     _email_id_nullable = True
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    evm_address: Mapped[str] = mapped_column(String, unique=True)
-    aptos_address: Mapped[str] = mapped_column(String, unique=True)
-    solana_address: Mapped[str] = mapped_column(String, unique=True)
-    btc_native_segwit_address: Mapped[str] = mapped_column(String, unique=True)
-    btc_taproot_address: Mapped[str] = mapped_column(String, unique=True)
-    evm_private: Mapped[str]
-    aptos_private: Mapped[str]
-    solana_private: Mapped[str]
-    btc_mnemo: Mapped[str]
+    evm_address: Mapped[str | None] = mapped_column(String, unique=True)
+    aptos_address: Mapped[str | None] = mapped_column(String, unique=True)
+    solana_address: Mapped[str | None] = mapped_column(String, unique=True)
+    btc_native_segwit_address: Mapped[str | None] = mapped_column(String, unique=True)
+    btc_taproot_address: Mapped[str | None] = mapped_column(String, unique=True)
+    evm_private: Mapped[str | None] = mapped_column(deferred=True, deferred_group=SECRETS_GROUP)
+    aptos_private: Mapped[str | None] = mapped_column(deferred=True, deferred_group=SECRETS_GROUP)
+    solana_private: Mapped[str | None] = mapped_column(deferred=True, deferred_group=SECRETS_GROUP)
+    btc_mnemo: Mapped[str | None] = mapped_column(deferred=True, deferred_group=SECRETS_GROUP)
+    derivation_index: Mapped[int | None] = mapped_column(unique=True, nullable=True)
+    # filters.Capability bits, recomputed by DBHelper.refresh_capabilities
+    capabilities: Mapped[int] = mapped_column(default=0, server_default="0")
 
     binance_deposit_id: Mapped[int | None] = mapped_column(
         ForeignKey("binance_deposits.id"), nullable=True, unique=True
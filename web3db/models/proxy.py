@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, CheckConstraint
+from sqlalchemy import String, CheckConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, BaseModel
@@ -13,6 +13,7 @@ class Proxy(BaseModel, Base):
     __tablename__ = 'proxies'
     __table_args__ = (
         CheckConstraint("proxy_type IN ('shared', 'individual')"),
+        Index('ix_proxies_proxy_type_id', 'proxy_type', 'id'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Tombstone(Base):
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        Index('ix_tombstones_table_name_deleted_at_id', 'table_name', 'deleted_at', 'id'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    table_name: Mapped[str] = mapped_column(String)
+    row_id: Mapped[int]
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'{self.id}:{self.table_name}:{self.row_id}'
+
+    def __str__(self):
+        return repr(self)
@@ -0,0 +1,202 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, or_
+from sqlalchemy.future import select
+
+from web3db.models import Email
+from web3db.utils.logger import my_logger
+
+TOKEN_URL = 'https://login.microsoftonline.com/common/oauth2/v2.0/token'
+TOKEN_TTL = 3600
+REFRESH_MARGIN = 300
+TOKEN_COLUMNS = (
+    Email.id, Email.refresh_token, Email.access_token, Email.client_id, Email.client_secret,
+    Email.access_token_updated_at
+)
+
+
+class TokenRefreshError(Exception):
+    pass
+
+
+@dataclass
+class TokenRefreshReport:
+    refreshed: int = 0
+    failed: dict[int, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def __str__(self):
+        return f'{self.refreshed} refreshed, {len(self.failed)} failed in {self.elapsed:.2f}s'
+
+
+class EmailTokenManager:
+    """
+    Serves cached Email access tokens and refreshes the ones that expire within `refresh_margin` seconds.
+    A token is taken to live `token_ttl` seconds from access_token_updated_at unless the endpoint returns expires_in.
+    Refreshes run at most `concurrency` at a time, each delayed by up to `jitter` seconds, and successful
+    ones are written back in one batched UPDATE of access_token, refresh_token and access_token_updated_at.
+    A token already being refreshed is not refreshed again: concurrent callers await the refresh in flight.
+    `token_url` and `transport` (an httpx transport) make it testable against a local stand-in endpoint.
+    """
+
+    def __init__(
+            self,
+            db,
+            token_url: str = TOKEN_URL,
+            token_ttl: int = TOKEN_TTL,
+            refresh_margin: int = REFRESH_MARGIN,
+            concurrency: int = 8,
+            jitter: float = 0.5,
+            timeout: float = 10.0,
+            scope: str = None,
+            transport=None
+    ):
+        self.db = db
+        self.token_url = token_url
+        self.token_ttl = token_ttl
+        self.refresh_margin = refresh_margin
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.timeout = timeout
+        self.scope = scope
+        self.transport = transport
+        self._tokens: dict[int, tuple[str, float]] = {}
+        self._refreshing: dict[int, asyncio.Future] = {}
+
+    def _expires_at(self, updated_at: datetime | None) -> float:
+        if updated_at is None:
+            return 0.0
+        return (updated_at - datetime(1970, 1, 1)).total_seconds() + self.token_ttl
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return expires_at - self.refresh_margin > time.time()
+
+    def cached(self, email_id: int) -> str | None:
+        token = self._tokens.get(email_id)
+        return token[0] if token is not None and self._is_fresh(token[1]) else None
+
+    async def access_token(self, email_id: int) -> str | None:
+        return (await self.access_tokens([email_id])).get(email_id)
+
+    async def access_tokens(self, email_ids: list[int]) -> dict[int, str]:
+        """email id -> valid access token, refreshing the expired ones of `email_ids` in one batch."""
+        tokens = {email_id: self.cached(email_id) for email_id in email_ids}
+        missing = [email_id for email_id, token in tokens.items() if token is None]
+        if missing:
+            rows = await self.db.execute_in(
+                lambda clause: select(*TOKEN_COLUMNS).where(clause), Email.id, missing, scalars=False
+            )
+            stale = []
+            for row in rows:
+                expires_at = self._expires_at(row.access_token_updated_at)
+                if row.access_token and self._is_fresh(expires_at):
+                    self._tokens[row.id] = row.access_token, expires_at
+                else:
+                    stale.append(row)
+            await self.refresh(stale)
+        return {email_id: token for email_id in email_ids if (token := self.cached(email_id)) is not None}
+
+    async def refresh_due(self, limit: int = None) -> TokenRefreshReport:
+        """Proactively refreshes tokens of emails with a refresh_token that expire within the margin."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.token_ttl - self.refresh_margin)
+        query = (
+            select(*TOKEN_COLUMNS)
+            .where(
+                Email.refresh_token.isnot(None),
+                or_(Email.access_token.is_(None), Email.access_token_updated_at.is_(None),
+                    Email.access_token_updated_at < cutoff)
+            )
+            .order_by(Email.access_token_updated_at, Email.id)
+            .limit(limit)
+        )
+        return await self.refresh((await self.db.execute_query(query)).all())
+
+    async def refresh(self, rows: list) -> TokenRefreshReport:
+        """
+        Refreshes the tokens of `rows` (TOKEN_COLUMNS rows) and writes the successful ones back.
+        Rows already being refreshed by another call are awaited instead and left out of the report.
+        """
+        report = TokenRefreshReport()
+        rows = [row for row in rows if row.refresh_token and self.cached(row.id) is None]
+        in_flight = [self._refreshing[row.id] for row in rows if row.id in self._refreshing]
+        rows = [row for row in rows if row.id not in self._refreshing]
+        if rows:
+            loop = asyncio.get_running_loop()
+            for row in rows:
+                self._refreshing[row.id] = loop.create_future()
+            try:
+                await self._refresh_rows(rows, report)
+            finally:
+                for row in rows:
+                    self._refreshing.pop(row.id).set_result(None)
+        if in_flight:
+            await asyncio.gather(*[asyncio.shield(future) for future in in_flight])
+        return report
+
+    async def _refresh_rows(self, rows: list, report: TokenRefreshReport):
+        import httpx
+
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+            results = await asyncio.gather(
+                *[self._refresh_one(client, semaphore, row) for row in rows], return_exceptions=True
+            )
+        values = []
+        tokens = {}
+        updated_at = datetime.utcnow()
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                report.failed[row.id] = str(result)
+                continue
+            values.append({
+                'id': row.id,
+                'access_token': result['access_token'],
+                'refresh_token': result.get('refresh_token') or row.refresh_token,
+                'access_token_updated_at': updated_at,
+            })
+            tokens[row.id] = (result['access_token'], time.time() + int(result.get('expires_in') or self.token_ttl))
+        if values:
+            await self.db.run_write(lambda session: session.execute(update(Email), values))
+        self._tokens.update(tokens)
+        report.refreshed = len(values)
+        report.elapsed = time.perf_counter() - start
+        my_logger.info('Email tokens: {}', report)
+
+    async def _refresh_one(self, client, semaphore: asyncio.Semaphore, row) -> dict:
+        await asyncio.sleep(random.uniform(0, self.jitter))
+        data = {'grant_type': 'refresh_token', 'refresh_token': row.refresh_token, 'client_id': row.client_id}
+        if row.client_secret:
+            data['client_secret'] = row.client_secret
+        if self.scope:
+            data['scope'] = self.scope
+        async with semaphore:
+            response = await client.post(self.token_url, data=data)
+        try:
+            payload = response.json() if response.content else {}
+        except ValueError:
+            payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
+        if response.status_code != 200 or 'access_token' not in payload:
+            raise TokenRefreshError(
+                f'{response.status_code}: {payload.get("error_description") or payload.get("error") or response.text}'
+            )
+        return payload
+
+    async def run(self, interval: float = 60, stop: asyncio.Event = None, limit: int = None):
+        """Refreshes due tokens every `interval` seconds until `stop` is set; a failed round is logged and retried."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                await self.refresh_due(limit)
+            except Exception as e:
+                my_logger.error('Email token refresh round failed: {}', e)
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,267 @@
+import asyncio
+import random
+from collections import defaultdict
+from typing import Any
+
+from sqlalchemy import func, inspect
+from sqlalchemy.future import select
+from sqlalchemy.orm import DeclarativeBase
+
+from web3db.core import DBHelper, ModelType
+from web3db.models import Profile, Proxy
+from web3db.utils import my_logger
+from web3db.views import ProfileView
+
+SHARD_ID_SPAN = 100_000_000
+
+
+class _ShardRollback(Exception):
+    """Raised inside a shard's write to roll it back when another shard of the same add_profiles call failed."""
+
+
+class ShardedDBHelper:
+    """
+    Partitions profiles and the rows linked to them across several databases, one DBHelper per connection string.
+    Shard i owns ids in [i * id_span, (i + 1) * id_span) of every table, so a row id routes to its shard
+    and per-shard results concatenated in shard order stay sorted by id. New profiles are spread round-robin
+    unless a shard is given, profiles sharing linked rows staying together, and ids for them and their linked
+    rows are allocated in the shard's range.
+    Login lookups and cross-shard reads scatter-gather over all shards in parallel.
+    """
+
+    def __init__(self, urls: list[str], id_span: int = SHARD_ID_SPAN, **db_kwargs):
+        self.shards = [DBHelper(url, **db_kwargs) for url in urls]
+        self.id_span = id_span
+        self._next_shard = 0
+        self._login_shards: dict[tuple[type, str], int] = {}
+
+    def shard_index(self, id_: int) -> int:
+        index = id_ // self.id_span
+        if not 0 <= index < len(self.shards):
+            raise ValueError(f'Id {id_} is outside of all {len(self.shards)} shards')
+        return index
+
+    def shard_for_id(self, id_: int) -> DBHelper:
+        return self.shards[self.shard_index(id_)]
+
+    def _group_by_shard(self, ids: list[int]) -> dict[int, list[int]]:
+        groups = defaultdict(list)
+        for id_ in ids:
+            groups[self.shard_index(id_)].append(id_)
+        return groups
+
+    async def scatter(self, method: str, *args, **kwargs) -> list[Any]:
+        """Calls DBHelper.`method` on every shard in parallel and returns the results in shard order."""
+        return await asyncio.gather(*[getattr(shard, method)(*args, **kwargs) for shard in self.shards])
+
+    async def _gather_rows(self, method: str, *args, limit: int = None, **kwargs) -> list:
+        results = await self.scatter(method, *args, limit=limit, **kwargs)
+        return [row for rows in results for row in rows][:limit]
+
+    async def create_all_tables(self, base: type[DeclarativeBase]):
+        await asyncio.gather(*[shard.create_all_tables(base) for shard in self.shards])
+
+    async def close(self):
+        await asyncio.gather(*[shard.close() for shard in self.shards])
+
+    async def add_profiles(self, profiles: list[Profile], shard: int = None) -> list[Profile]:
+        """
+        Adds new profiles with their linked rows, round-robin across shards unless `shard` is given. Profiles
+        sharing a linked row go to the same shard. Every shard flushes its part before any of them commits,
+        and if one fails all of them roll back.
+        """
+        batches = self._assign_shards(profiles, shard)
+        loop = asyncio.get_running_loop()
+        flushed = {index: loop.create_future() for index in batches}
+        decision = loop.create_future()
+
+        async def decide():
+            results = await asyncio.gather(*flushed.values(), return_exceptions=True)
+            decision.set_result(not any(isinstance(result, BaseException) for result in results))
+
+        results = await asyncio.gather(
+            decide(),
+            *[self._add_to_shard(index, records, flushed[index], decision) for index, records in batches.items()],
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise next((error for error in errors if not isinstance(error, _ShardRollback)), errors[0])
+        return profiles
+
+    def _assign_shards(self, profiles: list[Profile], shard: int = None) -> dict[int, list[Profile]]:
+        """
+        Groups profiles connected through shared linked rows (a proxy, an email, ...) and gives each group one
+        shard: the shard of the stored rows it links or references by id, `shard`, or the next one round-robin.
+        Raises ValueError before anything is written if a group holds rows of several shards or of a shard other
+        than `shard`.
+        """
+        parents = list(range(len(profiles)))
+
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        owners: dict[int, int] = {}
+        stored_ids = defaultdict(list)
+        for i, profile in enumerate(profiles):
+            rows = [profile] + [row for row, *_ in inspect(profile).mapper.cascade_iterator(
+                'save-update', inspect(profile)
+            )]
+            for row in rows:
+                stored_ids[i] += [
+                    value for attr in inspect(row).mapper.column_attrs
+                    if (attr.key == 'id' or attr.columns[0].foreign_keys)
+                    and (value := getattr(row, attr.key)) is not None
+                ]
+                if id(row) in owners:
+                    parents[find(i)] = find(owners[id(row)])
+                else:
+                    owners[id(row)] = i
+
+        groups = defaultdict(list)
+        for i in range(len(profiles)):
+            groups[find(i)].append(i)
+        batches = defaultdict(list)
+        for members in groups.values():
+            stored = {self.shard_index(id_) for i in members for id_ in stored_ids[i]}
+            if len(stored) > 1:
+                raise ValueError(f'Profiles share rows stored on shards {sorted(stored)}')
+            if stored and shard is not None and stored != {shard}:
+                raise ValueError(f'Profiles link rows stored on shard {stored.pop()}, not on shard {shard}')
+            if stored:
+                index = stored.pop()
+            elif shard is not None:
+                index = shard
+            else:
+                index = self._next_shard
+                self._next_shard = (self._next_shard + 1) % len(self.shards)
+            batches[index] += [profiles[i] for i in members]
+        return batches
+
+    async def _add_to_shard(
+            self, index: int, records: list[DeclarativeBase], flushed: asyncio.Future, decision: asyncio.Future
+    ):
+        low, high = index * self.id_span, (index + 1) * self.id_span
+
+        async def add(session):
+            session.add_all(records)
+            new_rows = defaultdict(list)
+            for row in session.new:
+                if row.id is None:
+                    new_rows[type(row)].append(row)
+            for model, rows in new_rows.items():
+                max_id = (await session.execute(
+                    select(func.max(model.id)).where(model.id >= low, model.id < high)
+                )).scalar()
+                next_id = max_id + 1 if max_id is not None else max(low, 1)
+                if next_id + len(rows) > high:
+                    raise ValueError(f'Shard {index} ran out of {model.__tablename__} ids')
+                for row in rows:
+                    row.id = next_id
+                    next_id += 1
+            await session.flush()
+            flushed.set_result(None)
+            if not await decision:
+                raise _ShardRollback(f'Shard {index} rolled back, another shard failed')
+
+        my_logger.info('Adding {} profiles to shard {}', len(records), index)
+        try:
+            await self.shards[index].run_write(add)
+        except Exception as e:
+            if not flushed.done():
+                flushed.set_exception(e)
+            raise
+
+    async def edit(self, records: DeclarativeBase | list[DeclarativeBase]):
+        records = records if isinstance(records, list) else [records]
+        by_shard = defaultdict(list)
+        for record in records:
+            by_shard[self.shard_index(record.id)].append(record)
+        await asyncio.gather(*[self.shards[index].edit(batch) for index, batch in by_shard.items()])
+
+    async def delete(self, records: DeclarativeBase | list[DeclarativeBase]):
+        records = records if isinstance(records, list) else [records]
+        by_shard = defaultdict(list)
+        for record in records:
+            by_shard[self.shard_index(record.id)].append(record)
+        await asyncio.gather(*[self.shards[index].delete(batch) for index, batch in by_shard.items()])
+
+    async def get_row_by_id(self, id_: int, model: ModelType, with_secrets: bool = False):
+        return await self.shard_for_id(id_).get_row_by_id(id_, model, with_secrets)
+
+    async def get_rows_by_id(self, ids: list[int], model: ModelType, with_secrets: bool = False) -> list:
+        groups = self._group_by_shard(ids)
+        results = await asyncio.gather(*[
+            self.shards[index].get_rows_by_id(shard_ids, model, with_secrets)
+            for index, shard_ids in sorted(groups.items())
+        ])
+        return [row for rows in results for row in rows]
+
+    async def _by_login(self, model: ModelType, login: str, method: str, *args):
+        key = (model, login)
+        if key in self._login_shards:
+            result = await getattr(self.shards[self._login_shards[key]], method)(*args)
+            if result is not None:
+                return result
+        for index, result in enumerate(await self.scatter(method, *args)):
+            if result is not None:
+                self._login_shards[key] = index
+                return result
+        return None
+
+    async def get_row_by_login(self, login: str, model: ModelType):
+        return await self._by_login(model, login, 'get_row_by_login', login, model)
+
+    async def get_profile_by_models_login(self, model: ModelType, login: str, with_secrets: bool = False) -> Profile:
+        return await self._by_login(model, login, 'get_profile_by_models_login', model, login, with_secrets)
+
+    async def get_ready_profiles_ids_by_model(self, model: ModelType, limit: int = None) -> list[int]:
+        return sorted(await self._gather_rows('get_ready_profiles_ids_by_model', model, limit=limit))
+
+    async def get_ready_profiles_by_model(
+            self, model: ModelType, limit: int = None, with_secrets: bool = False
+    ) -> list[Profile]:
+        return await self._gather_rows('get_ready_profiles_by_model', model, limit=limit, with_secrets=with_secrets)
+
+    async def get_profile_views(self, ids: list[int] = None, limit: int = None) -> list[ProfileView]:
+        if ids:
+            groups = self._group_by_shard(ids)
+            results = await asyncio.gather(*[
+                self.shards[index].get_profile_views(shard_ids) for index, shard_ids in sorted(groups.items())
+            ])
+            return [view for views in results for view in views][:limit]
+        return await self._gather_rows('get_profile_views', limit=limit)
+
+    async def get_ready_profile_views_by_model(self, model: ModelType, limit: int = None) -> list[ProfileView]:
+        return await self._gather_rows('get_ready_profile_views_by_model', model, limit=limit)
+
+    async def count_profiles(self) -> list[int]:
+        """Number of profiles on each shard."""
+        query = select(func.count(Profile.id))
+        return [result.scalar() for result in await self.scatter('execute_query', query)]
+
+    async def get_random_profile(self, with_secrets: bool = False) -> Profile | None:
+        counts = await self.count_profiles()
+        if not sum(counts):
+            return None
+        index = random.choices(range(len(self.shards)), weights=counts)[0]
+        return await self.shards[index].get_random_profile(with_secrets)
+
+    async def get_random_profiles_by_proxy(self, limit: int = None, with_secrets: bool = False) -> list[Profile]:
+        profiles = [
+            profile for profiles in await self.scatter('get_random_profiles_by_proxy', limit, with_secrets)
+            for profile in profiles
+        ]
+        random.shuffle(profiles)
+        return profiles[:limit]
+
+    async def get_random_profiles_ids_by_proxy(self, limit: int = None) -> list[int]:
+        ids = [id_ for ids in await self.scatter('get_random_profiles_ids_by_proxy', limit) for id_ in ids]
+        random.shuffle(ids)
+        return ids[:limit]
+
+    async def get_proxies_by_string(self, s: str) -> list[Proxy]:
+        return [proxy for proxies in await self.scatter('get_proxies_by_string', s) for proxy in proxies]
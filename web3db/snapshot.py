@@ -0,0 +1,200 @@
+import mmap
+import os
+import random
+import struct
+import time
+from bisect import bisect_left
+from dataclasses import fields
+from pathlib import Path
+
+from web3db.models import Profile, Proxy, Email, Twitter, Discord, Github
+from web3db.views import ProfileView, profile_view_query
+
+MAGIC = b'W3DBSNP1'
+VERSION = 1
+# magic, version, record size, row count, ids offset, records offset, heap offset, created at
+HEADER = struct.Struct('<8sIIQQQQd')
+STRING_FIELDS = tuple(field.name for field in fields(ProfileView) if field.name not in ('id', 'twitter_ready'))
+# id, (offset, length) of every string field in the heap, twitter_ready (0 false, 1 true, 2 null)
+RECORD = struct.Struct(f'<Q{2 * len(STRING_FIELDS)}IB')
+NULL_LENGTH = 0xFFFFFFFF
+READY_POSITION = STRING_FIELDS.index('twitter_login') + 1
+LOGIN_FIELDS = {
+    Email: 'email_login',
+    Twitter: 'twitter_login',
+    Discord: 'discord_login',
+    Github: 'github_login',
+    Proxy: 'proxy_string',
+}
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+async def write_snapshot(db, path: str | Path, chunk_size: int = 10_000) -> int:
+    """
+    Writes the non-secret ProfileView projection of every profile to `path` and returns the row count.
+    Layout: header, sorted uint64 id index, fixed-size records in id order and a deduplicated UTF-8 string heap.
+    The file is written next to `path` and renamed over it, so open readers keep their old snapshot.
+    """
+    ids, records, heap = bytearray(), bytearray(), bytearray()
+    offsets: dict[str, int] = {}
+    count = 0
+    last_id = 0
+    while True:
+        query = profile_view_query().where(Profile.id > last_id).order_by(Profile.id).limit(chunk_size)
+        rows = (await db.execute_query(query)).all()
+        if not rows:
+            break
+        for row in rows:
+            view = ProfileView(*row)
+            packed = []
+            for name in STRING_FIELDS:
+                value = getattr(view, name)
+                if value is None:
+                    packed += (0, NULL_LENGTH)
+                    continue
+                encoded = value.encode()
+                if value not in offsets:
+                    offsets[value] = len(heap)
+                    heap += encoded
+                packed += (offsets[value], len(encoded))
+            ready = 2 if view.twitter_ready is None else int(view.twitter_ready)
+            ids += struct.pack('<Q', view.id)
+            records += RECORD.pack(view.id, *packed, ready)
+            count += 1
+        last_id = rows[-1][0]
+    ids_offset = _align(HEADER.size)
+    records_offset = _align(ids_offset + len(ids))
+    heap_offset = records_offset + len(records)
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(
+            MAGIC, VERSION, RECORD.size, count, ids_offset, records_offset, heap_offset, time.time()
+        ))
+        file.write(b'\0' * (ids_offset - HEADER.size))
+        file.write(ids)
+        file.write(b'\0' * (records_offset - ids_offset - len(ids)))
+        file.write(records)
+        file.write(heap)
+    os.replace(tmp_path, path)
+    return count
+
+
+class ProfileSnapshot:
+    """
+    Read-only, memory-mapped reader of a file written by DBHelper.export_snapshot. Pages are shared through
+    the OS cache between processes and nothing is decoded until a row is looked up. Lookup methods mirror
+    the DBHelper ones that return profile views, ids and (id, login, ready) tuples.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, ids_offset, records_offset, heap_offset, created_at = (
+            HEADER.unpack_from(self._mmap)
+        )
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f'{self.path} is not a version {VERSION} profile snapshot')
+        self.created_at = created_at
+        self._count = count
+        self._records_offset = records_offset
+        self._heap_offset = heap_offset
+        self._ids = memoryview(self._mmap)[ids_offset:ids_offset + 8 * count].cast('Q')
+        self._logins: dict[str, dict[str, int]] = {}
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, '_ids', None) is not None:
+            self._ids.release()
+            self._ids = None
+        self._mmap.close()
+        self._file.close()
+
+    def _view(self, position: int) -> ProfileView:
+        id_, *packed, ready = RECORD.unpack_from(self._mmap, self._records_offset + position * RECORD.size)
+        data, heap_offset = self._mmap, self._heap_offset
+        strings = [
+            None if length == NULL_LENGTH else str(data[heap_offset + offset:heap_offset + offset + length], 'utf-8')
+            for offset, length in zip(packed[::2], packed[1::2])
+        ]
+        ready = None if ready == 2 else bool(ready)
+        return ProfileView(id_, *strings[:READY_POSITION], ready, *strings[READY_POSITION:])
+
+    def _ready_positions(self, limit: int = None) -> list[int]:
+        """Positions of profiles with a ready twitter, read from the flag byte without decoding the rows."""
+        positions = []
+        flag_offset = self._records_offset + RECORD.size - 1
+        for position in range(self._count):
+            if limit is not None and len(positions) >= limit:
+                break
+            if self._mmap[flag_offset + position * RECORD.size] == 1:
+                positions.append(position)
+        return positions
+
+    def _position(self, id_: int) -> int | None:
+        position = bisect_left(self._ids, id_)
+        return position if position < self._count and self._ids[position] == id_ else None
+
+    def views(self):
+        """All profile views in id order."""
+        return (self._view(position) for position in range(self._count))
+
+    def get_profile_view(self, id_: int) -> ProfileView | None:
+        position = self._position(id_)
+        return self._view(position) if position is not None else None
+
+    def get_profile_views(self, ids: list[int] = None, limit: int = None) -> list[ProfileView]:
+        if ids:
+            positions = sorted({position for id_ in ids if (position := self._position(id_)) is not None})
+        else:
+            positions = range(self._count)
+        return [self._view(position) for position in positions[:limit]]
+
+    def get_ready_profile_views_by_model(self, model, limit: int = None) -> list[ProfileView]:
+        if model is not Twitter:
+            raise ValueError(f'{model.__name__} has no ready flag')
+        return [self._view(position) for position in self._ready_positions(limit)]
+
+    def get_ready_profiles_ids_by_model(self, model, limit: int = None) -> list[int]:
+        if model is not Twitter:
+            raise ValueError(f'{model.__name__} has no ready flag')
+        return [self._ids[position] for position in self._ready_positions(limit)]
+
+    def get_profiles_light_by_model(
+            self, model, ids: list[int] = None, limit: int = None
+    ) -> list[tuple[int, str, bool | None]]:
+        login_field = LOGIN_FIELDS[model]
+        rows = []
+        for view in (self.get_profile_views(ids) if ids else self.views()):
+            if limit is not None and len(rows) >= limit:
+                break
+            login = getattr(view, login_field)
+            if login is not None:
+                rows.append((view.id, login, view.twitter_ready if model is Twitter else None))
+        return rows
+
+    def get_profile_view_by_models_login(self, model, login: str) -> ProfileView | None:
+        """Looks a profile up by the login of a linked account; the login index is built on first use."""
+        login_field = LOGIN_FIELDS[model]
+        if login_field not in self._logins:
+            self._logins[login_field] = {
+                getattr(view, login_field): view.id for view in self.views() if getattr(view, login_field) is not None
+            }
+        id_ = self._logins[login_field].get(login)
+        return self.get_profile_view(id_) if id_ is not None else None
+
+    def get_random_profile_view(self) -> ProfileView | None:
+        return self._view(random.randrange(self._count)) if self._count else None
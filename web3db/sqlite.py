@@ -0,0 +1,112 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from web3db.utils.logger import my_logger
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def configure_sqlite(engine: AsyncEngine, pragmas: dict = None):
+    """
+    Applies `pragmas` (SQLITE_PRAGMAS by default) to every new connection and lets SQLAlchemy emit BEGIN itself,
+    so SAVEPOINTs used by GroupCommitWriter work with the sqlite3 driver.
+    """
+    pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, 'begin')
+    def _on_begin(connection):
+        connection.exec_driver_sql('BEGIN')
+
+
+class GroupCommitWriter:
+    """
+    Single background task that owns all writes. Operations submitted by many coroutines are queued and the
+    writer commits everything queued since its last commit, up to `max_batch` operations, in one transaction.
+    Each operation gets its own session in its own SAVEPOINT of the shared connection, so a failing one raises to
+    its caller without undoing the others, and operations on the same rows don't clash in one identity map.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, max_batch: int = 256):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.transactions = 0
+        self.operations = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """Queues `operation(session)` and returns its result once the transaction holding it is committed."""
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+            if stop:
+                return
+
+    async def _commit(self, batch: list[tuple[WriteOperation, asyncio.Future]]):
+        outcomes = []
+        try:
+            async with self.session_factory.kw['bind'].connect() as connection, connection.begin():
+                for operation, future in batch:
+                    try:
+                        async with self.session_factory(
+                                bind=connection, join_transaction_mode='create_savepoint'
+                        ) as session:
+                            result = await operation(session)
+                            await session.commit()
+                        outcomes.append((future, result, None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            my_logger.error('Group commit of {} operations failed: {}', len(batch), e)
+            outcomes = [(future, None, e) for _, future in batch]
+        self.transactions += 1
+        self.operations += len(batch)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Commits everything already queued and stops the writer task."""
+        if self._task is not None and not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        self._task = None
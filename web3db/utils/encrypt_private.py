@@ -1,9 +1,9 @@
-import gnupg
-
-from .logger import logger
+from .logger import my_logger
 
 
 def encrypt(data: str, passphrase: str, recipient: str) -> str:
+    import gnupg
+
     gpg = gnupg.GPG()
     gpg.encoding = 'utf-8'
     status = gpg.encrypt(
@@ -12,14 +12,26 @@ def encrypt(data: str, passphrase: str, recipient: str) -> str:
         passphrase=passphrase,
         sign=recipient
     )
-    logger.info(status.status)
+    my_logger.info(status.status)
     return status.data.decode('utf-8')
 
 
-def decrypt(encoded_data: str, passphrase: str, echo: bool = False) -> str:
+class DecryptionError(ValueError):
+    pass
+
+
+def decrypt(encoded_data: str, passphrase: str, echo: bool = False, strict: bool = False) -> str:
+    """
+    Decrypts armored PGP data. gpg reports failures (a wrong passphrase, no agent) through the status and
+    returns no data, which is returned as ''; with `strict` they raise DecryptionError instead.
+    """
+    import gnupg
+
     gpg = gnupg.GPG()
     gpg.encoding = 'utf-8'
     status = gpg.decrypt(encoded_data, passphrase=passphrase)
     if echo:
-        logger.info(status.status)
+        my_logger.info(status.status)
+    if strict and not status.ok:
+        raise DecryptionError(f'gpg could not decrypt: {status.status}')
     return status.data.decode('utf-8')
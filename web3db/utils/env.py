@@ -1,11 +1,9 @@
+from functools import cache
 from pathlib import Path
 from typing import Optional
 
-from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-load_dotenv()
-
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -21,4 +19,15 @@ class Settings(BaseSettings):
     CONNECTION_STRING: str
 
 
-settings = Settings()
+@cache
+def get_settings() -> Settings:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Settings()
+
+
+def __getattr__(name: str):
+    if name == 'settings':
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,67 @@
+import base64
+import secrets
+
+ENVELOPE_PREFIX = 'w3e1:'
+KEY_ID_SIZE = 4
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+
+def is_envelope(value: str | None) -> bool:
+    return value is not None and value.startswith(ENVELOPE_PREFIX)
+
+
+def generate_data_key() -> bytes:
+    return secrets.token_bytes(32)
+
+
+def seal(plaintext: str, key: bytes, key_id: int) -> str:
+    """
+    AES-256-GCM encrypts `plaintext` under data key `key_id`.
+    Layout after the version prefix (urlsafe base64): key id (4) | nonce (12) | ciphertext | tag (16).
+    """
+    from Crypto.Cipher import AES
+
+    nonce = secrets.token_bytes(NONCE_SIZE)
+    header = key_id.to_bytes(KEY_ID_SIZE, 'big')
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+    cipher.update(header)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode('utf-8'))
+    return ENVELOPE_PREFIX + base64.urlsafe_b64encode(header + nonce + ciphertext + tag).decode('ascii')
+
+
+def envelope_key_id(value: str) -> int:
+    return int.from_bytes(base64.urlsafe_b64decode(value[len(ENVELOPE_PREFIX):])[:KEY_ID_SIZE], 'big')
+
+
+def open_envelope(value: str, keys: dict[int, bytes]) -> str:
+    from Crypto.Cipher import AES
+
+    blob = base64.urlsafe_b64decode(value[len(ENVELOPE_PREFIX):])
+    header, nonce = blob[:KEY_ID_SIZE], blob[KEY_ID_SIZE:KEY_ID_SIZE + NONCE_SIZE]
+    ciphertext, tag = blob[KEY_ID_SIZE + NONCE_SIZE:-TAG_SIZE], blob[-TAG_SIZE:]
+    key_id = int.from_bytes(header, 'big')
+    if key_id not in keys:
+        raise KeyError(f'Data key {key_id} is not loaded')
+    cipher = AES.new(keys[key_id], AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+    cipher.update(header)
+    return cipher.decrypt_and_verify(ciphertext, tag).decode('utf-8')
+
+
+class DataKeyRing:
+    """Unwrapped data keys by id, filled once by DBHelper.load_data_keys."""
+
+    def __init__(self, keys: dict[int, bytes] = None):
+        self.keys = keys or {}
+
+    def encryptor(self, key_id: int):
+        key = self.keys[key_id]
+        return lambda plaintext: seal(plaintext, key, key_id)
+
+    def decrypt(self, value: str, passphrase: str = None) -> str:
+        """Opens envelope secrets locally; legacy armored PGP secrets still go through gpg."""
+        if is_envelope(value):
+            return open_envelope(value, self.keys)
+        from .encrypt_private import decrypt
+
+        return decrypt(value, passphrase)
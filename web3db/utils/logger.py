@@ -1,14 +1,28 @@
+import os
+import random
 import sys
 from loguru import logger
 from pathlib import Path
 
 MAIN_DIR = Path(__file__).parent.parent.parent / 'logs'
-if not Path.exists(MAIN_DIR):
-    MAIN_DIR.mkdir()
+LOG_MODES = {
+    'default': dict(level='DEBUG', enqueue=False, serialize=False, sample_rate=1.0),
+    'fast': dict(level='INFO', enqueue=True, serialize=False, sample_rate=0.01),
+    'json': dict(level='INFO', enqueue=True, serialize=True, sample_rate=0.01),
+}
 
 
 class Logger:
+    """
+    loguru wrapper whose sinks are created on first use rather than at import.
+    The mode is taken from WEB3DB_LOG_MODE (default, fast or json) unless configure() is called explicitly;
+    WEB3DB_LOG_LEVEL and WEB3DB_LOG_SAMPLE_RATE override single settings of the mode.
+    Pass message arguments separately (my_logger.info('Got {} rows', n)) so nothing is formatted below the level.
+    """
     _instance = None
+    configured = False
+    min_level_no = 0
+    sample_rate = 1.0
 
     def __new__(cls):
         if cls._instance is None:
@@ -17,26 +31,66 @@ class Logger:
 
     def __init__(self):
         self.logger = logger
+
+    def configure(
+            self,
+            mode: str = None,
+            level: str = None,
+            enqueue: bool = None,
+            serialize: bool = None,
+            sample_rate: float = None
+    ):
+        options = dict(LOG_MODES[mode or os.getenv('WEB3DB_LOG_MODE', 'default')])
+        overrides = dict(
+            level=level or os.getenv('WEB3DB_LOG_LEVEL'),
+            enqueue=enqueue,
+            serialize=serialize,
+            sample_rate=sample_rate if sample_rate is not None else os.getenv('WEB3DB_LOG_SAMPLE_RATE')
+        )
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        if not Path.exists(MAIN_DIR):
+            MAIN_DIR.mkdir()
         self.logger.remove()
         format_string = (
             "<white>{time:YYYY-MM-DD HH:mm:ss}</white> | <level>{level: <8}</level> | "
             "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
         )
         log_configs = [
-            ('success.log', ['SUCCESS']),
-            ('info.log', ['INFO', 'DEBUG']),
-            ('error.log', ['ERROR', 'CRITICAL', 'WARNING'])
+            ('success.log', {'SUCCESS'}),
+            ('info.log', {'INFO', 'DEBUG'}),
+            ('error.log', {'ERROR', 'CRITICAL', 'WARNING'})
         ]
         for filename, levels in log_configs:
             self.logger.add(
                 MAIN_DIR / filename,
                 rotation="500 MB",
+                level=options['level'],
                 filter=lambda record, levels=levels: record["level"].name in levels,
-                format=format_string
+                format=format_string,
+                enqueue=options['enqueue'],
+                serialize=options['serialize']
             )
-        self.logger.add(sys.stderr, format=format_string)
+        self.logger.add(
+            sys.stderr, level=options['level'], format=format_string,
+            enqueue=options['enqueue'], serialize=options['serialize']
+        )
+        self.min_level_no = self.logger.level(options['level']).no
+        self.sample_rate = float(options['sample_rate'])
+        self.configured = True
+
+    def enabled_for(self, level: str) -> bool:
+        if not self.configured:
+            self.configure()
+        return self.logger.level(level).no >= self.min_level_no
+
+    def sampled(self, level: str, message: str, *args, **kwargs):
+        """Logs a per-row message for roughly `sample_rate` of the calls."""
+        if self.enabled_for(level) and (self.sample_rate >= 1 or random.random() < self.sample_rate):
+            self.logger.opt(depth=1).log(level, message, *args, **kwargs)
 
     def __getattr__(self, name):
+        if not self.configured:
+            self.configure()
         return getattr(self.logger, name)
 
 
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+
+from sqlalchemy import Select
+from sqlalchemy.future import select
+
+from web3db.models import Profile, Proxy, Email, Twitter, Discord, Github
+
+
+@dataclass(slots=True, frozen=True)
+class ProfileView:
+    id: int
+    evm_address: str | None
+    aptos_address: str | None
+    solana_address: str | None
+    btc_native_segwit_address: str | None
+    btc_taproot_address: str | None
+    proxy_string: str | None
+    proxy_type: str | None
+    email_login: str | None
+    twitter_login: str | None
+    twitter_ready: bool | None
+    discord_login: str | None
+    github_login: str | None
+
+
+PROFILE_VIEW_COLUMNS = (
+    Profile.id,
+    Profile.evm_address,
+    Profile.aptos_address,
+    Profile.solana_address,
+    Profile.btc_native_segwit_address,
+    Profile.btc_taproot_address,
+    Proxy.proxy_string,
+    Proxy.proxy_type,
+    Email.login.label('email_login'),
+    Twitter.login.label('twitter_login'),
+    Twitter.ready.label('twitter_ready'),
+    Discord.login.label('discord_login'),
+    Github.login.label('github_login'),
+)
+
+
+def profile_view_query() -> Select:
+    """Column-only select of the ProfileView projection, bypassing the ORM identity map."""
+    return (
+        select(*PROFILE_VIEW_COLUMNS)
+        .select_from(Profile)
+        .outerjoin(Proxy, Profile.proxy)
+        .outerjoin(Email, Profile.email)
+        .outerjoin(Twitter, Profile.twitter)
+        .outerjoin(Discord, Profile.discord)
+        .outerjoin(Github, Profile.github)
+    )
+
+
+def to_profile_views(rows) -> list[ProfileView]:
+    return [ProfileView(*row) for row in rows]
@@ -0,0 +1,278 @@
+import hashlib
+import hmac
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from web3db.models import Profile
+from web3db.utils.encrypt_private import encrypt, decrypt
+
+HARDENED = 0x80000000
+
+EVM_PARENT_PATH = "m/44'/60'/0'/0"
+BTC_NATIVE_SEGWIT_PARENT_PATH = "m/84'/0'/0'/0"
+BTC_TAPROOT_PARENT_PATH = "m/86'/0'/0'/0"
+SOLANA_PARENT_PATH = "m/44'/501'"
+APTOS_PARENT_PATH = "m/44'/637'"
+
+
+def _setup_bitcoin():
+    from bitcoinutils.setup import setup, get_network
+
+    if get_network() != 'mainnet':
+        setup('mainnet')
+
+
+def _parse_path(path: str) -> list[int]:
+    return [
+        int(node[:-1]) + HARDENED if node.endswith("'") else int(node)
+        for node in path.split('/')[1:]
+    ]
+
+
+def _slip10_ed25519_child(key: bytes, chain_code: bytes, index: int) -> tuple[bytes, bytes]:
+    digest = hmac.new(chain_code, b'\x00' + key + (index | HARDENED).to_bytes(4, 'big'), hashlib.sha512).digest()
+    return digest[:32], digest[32:]
+
+
+class HDKeychain:
+    """
+    Derives keys for profile N from one BIP-39 master mnemonic, on the paths the chain providers use:
+    EVM m/44'/60'/0'/0/N, BTC m/84'/0'/0'/0/N and m/86'/0'/0'/0/N (BIP-32 secp256k1),
+    Solana m/44'/501'/N'/0' and Aptos m/44'/637'/N'/0'/0' (SLIP-10 ed25519).
+    The seed is stretched once and the parent node of each path is cached,
+    so a profile costs one child derivation per chain.
+    """
+
+    def __init__(self, mnemonic: str, passphrase: str = ''):
+        from mnemonic import Mnemonic
+        from eth_account.hdaccount.deterministic import hmac_sha512
+
+        seed = Mnemonic.to_seed(mnemonic, passphrase)
+        secp256k1_master = hmac_sha512(b'Bitcoin seed', seed)
+        ed25519_master = hmac.new(b'ed25519 seed', seed, hashlib.sha512).digest()
+        self._secp256k1_root = (secp256k1_master[:32], secp256k1_master[32:])
+        self._ed25519_root = (ed25519_master[:32], ed25519_master[32:])
+        self._parents = {}
+
+    def _secp256k1_parent(self, path: str) -> tuple[bytes, bytes]:
+        from eth_account.hdaccount.deterministic import derive_child_key, Node
+
+        if path not in self._parents:
+            key, chain_code = self._secp256k1_root
+            for node in path.split('/')[1:]:
+                key, chain_code = derive_child_key(key, chain_code, Node.decode(node))
+            self._parents[path] = key, chain_code
+        return self._parents[path]
+
+    def _ed25519_parent(self, path: str) -> tuple[bytes, bytes]:
+        if path not in self._parents:
+            key, chain_code = self._ed25519_root
+            for index in _parse_path(path):
+                key, chain_code = _slip10_ed25519_child(key, chain_code, index)
+            self._parents[path] = key, chain_code
+        return self._parents[path]
+
+    def secp256k1_key(self, parent_path: str, index: int) -> bytes:
+        from eth_account.hdaccount.deterministic import derive_child_key, SoftNode
+
+        return derive_child_key(*self._secp256k1_parent(parent_path), SoftNode(index))[0]
+
+    def ed25519_key(self, parent_path: str, index: int, depth: int) -> bytes:
+        key, chain_code = _slip10_ed25519_child(*self._ed25519_parent(parent_path), index)
+        for _ in range(depth):
+            key, chain_code = _slip10_ed25519_child(key, chain_code, 0)
+        return key
+
+    def derive(self, index: int, chains: list[str] = None) -> dict[str, str]:
+        """Plaintext secrets and addresses of profile `index` for `chains` (all by default), keyed by Profile column."""
+        wallets = {}
+        for chain in chains or CHAINS:
+            wallets.update(CHAINS[chain].derive(self, index))
+        return wallets
+
+
+def generate_master_seed() -> str:
+    """New 24-word BIP-39 master mnemonic, to be stored encrypted and passed to create_profiles."""
+    from mnemonic import Mnemonic
+
+    return Mnemonic().generate(256)
+
+
+class ChainProvider(ABC):
+    """
+    How one chain generates random keys, derives keys from an HDKeychain and encrypts its secret.
+    `secret_column` and `address_columns` name the Profile columns the chain fills.
+    """
+    name: str
+    secret_column: str
+    address_columns: tuple[str, ...]
+
+    @abstractmethod
+    def generate(self) -> dict[str, str]:
+        ...
+
+    @abstractmethod
+    def derive(self, keychain: HDKeychain, index: int) -> dict[str, str]:
+        ...
+
+    def encrypt(self, secret: str, encrypt_secret: Callable[[str], str]) -> str:
+        return encrypt_secret(secret)
+
+
+class EVMChain(ChainProvider):
+    name = 'evm'
+    secret_column = 'evm_private'
+    address_columns = ('evm_address',)
+
+    def generate(self) -> dict[str, str]:
+        from eth_account import Account as EVMAccount
+
+        return self._wallet(EVMAccount.create())
+
+    def derive(self, keychain: HDKeychain, index: int) -> dict[str, str]:
+        from eth_account import Account as EVMAccount
+
+        return self._wallet(EVMAccount.from_key(keychain.secp256k1_key(EVM_PARENT_PATH, index)))
+
+    @staticmethod
+    def _wallet(account) -> dict[str, str]:
+        return {'evm_private': account.key.hex(), 'evm_address': account.address}
+
+
+class AptosChain(ChainProvider):
+    name = 'aptos'
+    secret_column = 'aptos_private'
+    address_columns = ('aptos_address',)
+
+    def generate(self) -> dict[str, str]:
+        from aptos_sdk.account import Account as AptosAccount
+
+        return self._wallet(AptosAccount.generate())
+
+    def derive(self, keychain: HDKeychain, index: int) -> dict[str, str]:
+        from aptos_sdk.account import Account as AptosAccount
+
+        return self._wallet(AptosAccount.load_key(keychain.ed25519_key(APTOS_PARENT_PATH, index, depth=2).hex()))
+
+    @staticmethod
+    def _wallet(account) -> dict[str, str]:
+        return {'aptos_private': account.private_key.hex(), 'aptos_address': str(account.address())}
+
+
+class SolanaChain(ChainProvider):
+    name = 'solana'
+    secret_column = 'solana_private'
+    address_columns = ('solana_address',)
+
+    def generate(self) -> dict[str, str]:
+        from solders.keypair import Keypair
+
+        return self._wallet(Keypair())
+
+    def derive(self, keychain: HDKeychain, index: int) -> dict[str, str]:
+        from solders.keypair import Keypair
+
+        return self._wallet(Keypair.from_seed(keychain.ed25519_key(SOLANA_PARENT_PATH, index, depth=1)))
+
+    @staticmethod
+    def _wallet(keypair) -> dict[str, str]:
+        import base58
+
+        return {
+            'solana_private': base58.b58encode(keypair.secret() + bytes(keypair.pubkey())).decode(),
+            'solana_address': str(keypair.pubkey()),
+        }
+
+
+class BTCChain(ChainProvider):
+    name = 'btc'
+    secret_column = 'btc_mnemo'
+    address_columns = ('btc_native_segwit_address', 'btc_taproot_address')
+
+    def generate(self) -> dict[str, str]:
+        from mnemonic import Mnemonic
+        from bitcoinutils.hdwallet import HDWallet
+
+        _setup_bitcoin()
+        btc_mnemo = Mnemonic().generate(256)
+        btc_hdwallet = HDWallet(mnemonic=btc_mnemo)
+        btc_hdwallet.from_path("m/84'/0'/0'/0/0")
+        segwit_key = btc_hdwallet.get_private_key()
+        btc_hdwallet.from_path("m/86'/0'/0'/0/0")
+        taproot_key = btc_hdwallet.get_private_key()
+        return {'btc_mnemo': btc_mnemo, **self._addresses(segwit_key, taproot_key)}
+
+    def derive(self, keychain: HDKeychain, index: int) -> dict[str, str]:
+        from bitcoinutils.keys import PrivateKey
+
+        _setup_bitcoin()
+        segwit_key = PrivateKey(b=keychain.secp256k1_key(BTC_NATIVE_SEGWIT_PARENT_PATH, index))
+        taproot_key = PrivateKey(b=keychain.secp256k1_key(BTC_TAPROOT_PARENT_PATH, index))
+        return {
+            'btc_native_segwit_private': segwit_key.to_wif(),
+            'btc_taproot_private': taproot_key.to_wif(),
+            **self._addresses(segwit_key, taproot_key)
+        }
+
+    @staticmethod
+    def _addresses(segwit_key, taproot_key) -> dict[str, str]:
+        return {
+            'btc_native_segwit_address': segwit_key.get_public_key().get_segwit_address().to_string(),
+            'btc_taproot_address': taproot_key.get_public_key().get_taproot_address().to_string(),
+        }
+
+
+CHAINS: dict[str, ChainProvider] = {}
+
+
+def register_chain(provider: ChainProvider) -> ChainProvider:
+    CHAINS[provider.name] = provider
+    return provider
+
+
+for _provider in (EVMChain(), AptosChain(), SolanaChain(), BTCChain()):
+    register_chain(_provider)
+
+
+def generate_random_wallets(chains: list[str] = None) -> dict[str, str]:
+    """Fresh random keys for `chains` (all by default), as plaintext secrets and addresses keyed by Profile column."""
+    wallets = {}
+    for chain in chains or CHAINS:
+        wallets.update(CHAINS[chain].generate())
+    return wallets
+
+
+def derive_profile_wallets(profile: Profile, master_seed: str, passphrase: str) -> dict[str, str]:
+    """Plaintext keys and addresses of a profile created with create_profiles(master_seed=...)."""
+    if profile.derivation_index is None:
+        raise ValueError(f'Profile {profile.id} has no derivation index')
+    return HDKeychain(decrypt(master_seed, passphrase, strict=True)).derive(profile.derivation_index)
+
+
+def gpg_encryptor(recipient: str, passphrase: str) -> Callable[[str], str]:
+    return lambda secret: encrypt(secret, passphrase=passphrase, recipient=recipient)
+
+
+def wallet_columns(
+        wallets: dict[str, str],
+        encrypt_secret: Callable[[str], str] = None,
+        chains: list[str] = None
+) -> dict[str, str | None]:
+    """
+    Profile column values of `chains` (all by default) taken from `wallets`.
+    Secrets are encrypted by their chain provider with `encrypt_secret` (gpg_encryptor or
+    DataKeyRing.encryptor) when given, otherwise left empty.
+    """
+    columns = {}
+    for chain in chains or CHAINS:
+        provider = CHAINS[chain]
+        for column in provider.address_columns:
+            columns[column] = wallets.get(column)
+        secret = wallets.get(provider.secret_column) if encrypt_secret is not None else None
+        columns[provider.secret_column] = provider.encrypt(secret, encrypt_secret) if secret is not None else None
+    return columns
+
+
+def apply_wallets(profile: Profile, wallets: dict[str, str], encrypt_secret: Callable[[str], str] = None):
+    for column, value in wallet_columns(wallets, encrypt_secret).items():
+        setattr(profile, column, value)